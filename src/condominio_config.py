@@ -0,0 +1,59 @@
+"""
+Configuração por condomínio para Extract Fotos
+Responsável por carregar o arquivo de configuração com os padrões de cada condomínio
+"""
+
+import os
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+# Caminho padrão do arquivo de configuração (pode ser sobrescrito no .env)
+DEFAULT_CONFIG_PATH = Path(__file__).resolve().parent.parent / "config" / "condominios.json"
+
+def get_config_path() -> Path:
+    """Retorna o caminho do arquivo de configuração dos condomínios"""
+    return Path(os.getenv('CONDOMINIOS_CONFIG_PATH', str(DEFAULT_CONFIG_PATH)))
+
+def load_config_file(path: Optional[str] = None) -> Dict:
+    """
+    Carrega o arquivo de configuração completo
+
+    Args:
+        path: Caminho do arquivo (opcional, usa o padrão se não informado)
+
+    Returns:
+        Dicionário com a configuração ou vazio se o arquivo não existir
+    """
+    config_path = Path(path) if path else get_config_path()
+
+    if not config_path.exists():
+        return {}
+
+    try:
+        with open(config_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Arquivo de configuração inválido ({config_path}): {e}")
+
+def load_condominio_config(folder_id: Optional[str] = None, path: Optional[str] = None) -> Dict:
+    """
+    Obtém a configuração de um condomínio específico
+
+    A configuração do condomínio é mesclada sobre a seção "padrao",
+    então cada condomínio só precisa declarar o que for diferente.
+
+    Args:
+        folder_id: ID da pasta do condomínio no Google Drive
+        path: Caminho do arquivo de configuração (opcional)
+
+    Returns:
+        Dicionário com a configuração efetiva do condomínio
+    """
+    config = load_config_file(path)
+
+    effective = dict(config.get('padrao', {}))
+    if folder_id:
+        effective.update(config.get('condominios', {}).get(folder_id, {}))
+
+    return effective
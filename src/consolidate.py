@@ -0,0 +1,319 @@
+"""
+Consolidação de relatórios para Extract Fotos
+Responsável por juntar os relatórios de vários condomínios em um relatório único
+"""
+
+import os
+import csv
+import heapq
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from parser import unit_sort_key
+from excel_generator import EXCEL_MAX_ROWS
+from progress import atomic_output
+
+# Coluna adicionada para identificar o condomínio de cada linha
+CONDOMINIO_COLUMN = "Condomínio"
+
+# Nome da aba de dados do relatório consolidado (as abas seguintes recebem " 2", " 3", ...)
+DATA_SHEET_TITLE = "Dados Consolidados"
+
+# Prefixo dos relatórios gerados pelo pipeline (o nome não identifica o condomínio)
+GENERATED_REPORT_PREFIX = "extract_fotos"
+
+# Métricas somáveis da aba "Estatísticas" -> chaves de get_statistics
+STATISTICS_LABELS = {
+    "Total de Arquivos": 'total_files',
+    "Arquivos Válidos": 'valid_files',
+    "Arquivos Inválidos": 'invalid_files',
+    "COM Blocos": 'with_blocks',
+    "SEM Blocos": 'without_blocks',
+    "Fotos Fora da Janela": 'outside_window',
+}
+
+class ReportSource:
+    """Relatório de um condomínio lido em streaming (CSV, Parquet ou xlsx)"""
+
+    def __init__(self, path: str, condominio: Optional[str] = None):
+        """
+        Args:
+            path: Caminho do relatório
+            condominio: Nome do condomínio (opcional, usa o nome do arquivo ou, para
+                        relatórios gerados pelo pipeline, o nome da pasta, ex.: o Folder ID)
+        """
+        self.path = path
+        self.condominio = condominio or self._default_name(path)
+        self.extension = os.path.splitext(path)[1].lower()
+
+        # Lê apenas o cabeçalho
+        raw_rows = self._iter_raw_rows()
+        self.columns = next(raw_rows)
+        raw_rows.close()
+
+    @staticmethod
+    def _default_name(path: str) -> str:
+        """Nome padrão do condomínio a partir do caminho do relatório"""
+        folder, filename = os.path.split(os.path.abspath(path))
+        stem = os.path.splitext(filename)[0]
+        # Relatórios do pipeline e do serviço têm o mesmo nome em todos os condomínios;
+        # o serviço grava cada um na pasta do condomínio (relatorios/<Folder ID>)
+        if stem.startswith(GENERATED_REPORT_PREFIX) and os.path.basename(folder):
+            return os.path.basename(folder)
+        return stem
+
+    @classmethod
+    def from_argument(cls, argument: str) -> 'ReportSource':
+        """Cria a fonte a partir de um argumento 'caminho' ou 'nome=caminho'"""
+        name, separator, path = argument.partition('=')
+        if separator and name and path and not os.path.exists(argument):
+            return cls(path, name)
+        return cls(argument)
+
+    def rows(self) -> Iterator[Tuple[tuple, Dict]]:
+        """
+        Itera as linhas do relatório com a chave de ordenação
+
+        Raises:
+            ValueError: Se o relatório não estiver ordenado por bloco/apartamento
+        """
+        previous = None
+        for row in self.records():
+            key = (self.condominio, *unit_sort_key(
+                self._text(row.get('Bloco')), self._text(row.get('Apartamento'))
+            ))
+            if previous is not None and key < previous:
+                raise ValueError(
+                    f"Relatório fora de ordem ({self.path}); gere-o novamente para consolidar"
+                )
+            previous = key
+
+            row[CONDOMINIO_COLUMN] = self.condominio
+            yield key, row
+
+    def records(self) -> Iterator[Dict]:
+        """Itera as linhas do relatório como dicionários coluna -> valor"""
+        raw_rows = self._iter_raw_rows()
+        next(raw_rows)  # Cabeçalho
+
+        for values in raw_rows:
+            yield dict(zip(self.columns, values))
+
+    def read_statistics(self) -> Optional[Dict]:
+        """Lê a aba "Estatísticas" de um relatório xlsx (None para outros formatos)"""
+        if self.extension != '.xlsx':
+            return None
+
+        workbook = load_workbook(self.path, read_only=True)
+        try:
+            if "Estatísticas" not in workbook.sheetnames:
+                return None
+
+            stats = {key: 0 for key in STATISTICS_LABELS.values()}
+            for row in workbook["Estatísticas"].iter_rows(min_row=2, max_col=2, values_only=True):
+                label, value = row[0], row[1]
+                if label in STATISTICS_LABELS and isinstance(value, (int, float)):
+                    stats[STATISTICS_LABELS[label]] = int(value)
+            return stats
+        finally:
+            workbook.close()
+
+    def _iter_raw_rows(self) -> Iterator[tuple]:
+        """Itera as linhas brutas (a primeira é o cabeçalho)"""
+        if self.extension == '.csv':
+            with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+                yield from (tuple(row) for row in csv.reader(f))
+        elif self.extension == '.parquet':
+            yield from self._iter_parquet_rows()
+        elif self.extension == '.xlsx':
+            yield from self._iter_xlsx_rows(self.path)
+        else:
+            raise ValueError(f"Formato não suportado: {self.path}")
+
+    def _iter_parquet_rows(self) -> Iterator[tuple]:
+        """Lê o Parquet em lotes (pyarrow é opcional)"""
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Instale o pyarrow para consolidar relatórios Parquet")
+
+        parquet_file = pq.ParquetFile(self.path)
+        yield tuple(parquet_file.schema_arrow.names)
+        for batch in parquet_file.iter_batches(batch_size=10_000):
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+
+    def _iter_xlsx_rows(self, path: str) -> Iterator[tuple]:
+        """Lê a aba de dados em modo read_only; relatórios divididos seguem o índice"""
+        workbook = load_workbook(path, read_only=True)
+        try:
+            if "Índice" in workbook.sheetnames:
+                parts = [
+                    row[1] for row in workbook["Índice"].iter_rows(min_row=2, values_only=True) if row[1]
+                ]
+                folder = os.path.dirname(path)
+                for number, part in enumerate(parts):
+                    part_rows = self._iter_xlsx_rows(os.path.join(folder, part))
+                    header = next(part_rows)
+                    if number == 0:
+                        yield header
+                    yield from part_rows
+                return
+
+            yield from workbook["Dados Extraídos"].iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    @staticmethod
+    def _text(value) -> Optional[str]:
+        """Converte células numéricas/vazias em texto"""
+        if value is None or value == '' or value == 'N/A':
+            return None
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        return str(value)
+
+def merge_statistics(stats_list: List[Dict]) -> Dict:
+    """
+    Soma as estatísticas de vários condomínios em totais da carteira
+
+    Args:
+        stats_list: Estatísticas no formato de FileNameParser.get_statistics
+
+    Returns:
+        Dicionário com os totais e a taxa de sucesso recalculada
+    """
+    totals = {key: 0 for key in STATISTICS_LABELS.values()}
+    error_files = []
+
+    for stats in stats_list:
+        for key in totals:
+            totals[key] += stats.get(key, 0)
+        error_files.extend(stats.get('error_files', []))
+
+    totals['error_files'] = error_files
+    totals['success_rate'] = (
+        totals['valid_files'] / totals['total_files'] * 100 if totals['total_files'] > 0 else 0
+    )
+    return totals
+
+def consolidate_reports(sources: List[ReportSource], output_filename: str) -> Dict:
+    """
+    Gera o relatório da carteira com um k-way merge dos relatórios dos condomínios
+
+    Cada relatório é lido em streaming e já vem ordenado por bloco/apartamento,
+    então a memória usada depende do número de relatórios, não do número de linhas.
+    No xlsx, os dados continuam em novas abas quando passam do limite de linhas do Excel.
+    Relatórios CSV/Parquet não têm a aba "Estatísticas": os totais ficam parciais e
+    os condomínios sem estatísticas são listados em 'missing_statistics'.
+
+    Args:
+        sources: Relatórios dos condomínios
+        output_filename: Arquivo de saída (.xlsx ou .csv)
+
+    Returns:
+        Estatísticas consolidadas da carteira
+
+    Raises:
+        ValueError: Se dois relatórios tiverem o mesmo nome de condomínio
+    """
+    names = [source.condominio for source in sources]
+    repeated = sorted({name for name in names if names.count(name) > 1})
+    if repeated:
+        raise ValueError(
+            f"Condomínio repetido: {', '.join(repeated)} (informe os nomes com nome=caminho)"
+        )
+
+    # Colunas na ordem de aparição, com o condomínio primeiro
+    columns = [CONDOMINIO_COLUMN]
+    for source in sources:
+        columns.extend(c for c in source.columns if c not in columns)
+
+    source_stats = [(source, source.read_statistics()) for source in sources]
+    stats = merge_statistics([s for _, s in source_stats if s])
+    stats['missing_statistics'] = [source.condominio for source, s in source_stats if not s]
+    if stats['missing_statistics']:
+        print(f"⚠️  Totais parciais: {len(stats['missing_statistics'])} relatórios sem a aba Estatísticas "
+              f"(CSV/Parquet) não entram nos totais: {', '.join(stats['missing_statistics'])}")
+
+    merged = heapq.merge(*(source.rows() for source in sources), key=lambda item: item[0])
+    rows = ([row.get(column, '') for column in columns] for _, row in merged)
+
+    if output_filename.lower().endswith('.csv'):
+        total_rows = _write_csv(output_filename, columns, rows)
+    else:
+        total_rows = _write_xlsx(output_filename, columns, rows, stats)
+
+    print(f"✅ Relatório consolidado: {output_filename} ({total_rows} linhas de {len(sources)} relatórios)")
+    return stats
+
+def _write_csv(output_filename: str, columns: List[str], rows: Iterator[list]) -> int:
+    """Grava o relatório consolidado em CSV"""
+    count = 0
+    with atomic_output(output_filename) as temp_filename:
+        with open(temp_filename, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+    return count
+
+def _write_xlsx(output_filename: str, columns: List[str], rows: Iterator[list], stats: Dict) -> int:
+    """Grava o relatório consolidado em xlsx (modo write_only, memória constante, várias abas se preciso)"""
+    workbook = Workbook(write_only=True)
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+
+    def header(ws, titles):
+        cells = []
+        for title in titles:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.fill = header_fill
+            cell.font = header_font
+            cells.append(cell)
+        return cells
+
+    # O write_only não confere o limite de linhas do Excel: abre uma nova aba ao atingi-lo
+    sheet_rows = EXCEL_MAX_ROWS - 1
+    count = 0
+    for row in rows:
+        if count % sheet_rows == 0:
+            sheet_number = count // sheet_rows + 1
+            data_ws = workbook.create_sheet(
+                DATA_SHEET_TITLE if sheet_number == 1 else f"{DATA_SHEET_TITLE} {sheet_number}"
+            )
+            data_ws.append(header(data_ws, columns))
+        data_ws.append(row)
+        count += 1
+    if count == 0:
+        data_ws = workbook.create_sheet(DATA_SHEET_TITLE)
+        data_ws.append(header(data_ws, columns))
+
+    stats_ws = workbook.create_sheet("Totais da Carteira")
+    stats_ws.append(header(stats_ws, ["Métrica", "Valor"]))
+    for label, key in STATISTICS_LABELS.items():
+        stats_ws.append([label, stats.get(key, 0)])
+    stats_ws.append(["Taxa de Sucesso", f"{stats.get('success_rate', 0):.1f}%"])
+    stats_ws.append(["Linhas Consolidadas", count])
+    stats_ws.append(["Relatórios sem Estatísticas", len(stats.get('missing_statistics', []))])
+
+    with atomic_output(output_filename) as temp_filename:
+        workbook.save(temp_filename)
+    return count
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Consolida relatórios de vários condomínios")
+    arg_parser.add_argument("saida", help="Arquivo de saída (.xlsx ou .csv)")
+    arg_parser.add_argument("relatorios", nargs='+',
+                            help="Relatórios dos condomínios (.xlsx, .csv ou .parquet), opcionalmente como nome=caminho")
+    args = arg_parser.parse_args()
+
+    try:
+        stats = consolidate_reports([ReportSource.from_argument(arg) for arg in args.relatorios], args.saida)
+        print(f"📊 Total de arquivos: {stats['total_files']} | Taxa de sucesso: {stats['success_rate']:.1f}%")
+    except Exception as e:
+        print(f"❌ Erro durante a consolidação: {e}")
@@ -0,0 +1,131 @@
+"""
+Detector de duplicados para Extract Fotos
+Responsável por encontrar fotos repetidas ou conflitantes de uma mesma unidade
+"""
+
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from parser import FileInfo, unit_key
+
+class IssueType(Enum):
+    """Tipos de problema detectados por unidade"""
+    DUPLICADO_EXATO = "Duplicado exato"
+    LEITURAS_CONFLITANTES = "Leituras conflitantes"
+    VARIACAO_BLOCO = "Variação de maiúsculas no bloco"
+    IMAGEM_REPETIDA = "Mesma imagem com nomes diferentes"
+    IMAGEM_CONFLITANTE = "Mesma imagem com leituras diferentes"
+
+@dataclass
+class DuplicateIssue:
+    """Problema encontrado para uma unidade"""
+    issue_type: IssueType
+    bloco: Optional[str]
+    apartamento: Optional[str]
+    filenames: List[str] = field(default_factory=list)
+    leituras: List[str] = field(default_factory=list)
+
+def build_unit_index(files_info: List[FileInfo]) -> Dict[Tuple[str, str], List[FileInfo]]:
+    """
+    Indexa os arquivos válidos por unidade (bloco, apartamento)
+
+    Args:
+        files_info: Lista de FileInfo processados
+
+    Returns:
+        Dicionário chave da unidade -> arquivos da unidade
+    """
+    index: Dict[Tuple[str, str], List[FileInfo]] = {}
+    for file_info in files_info:
+        if not file_info.is_valid:
+            continue
+        index.setdefault(unit_key(file_info.bloco, file_info.apartamento), []).append(file_info)
+    return index
+
+def build_content_index(files_info: List[FileInfo]) -> Dict[str, List[FileInfo]]:
+    """
+    Indexa os arquivos pelo md5Checksum do Google Drive
+
+    Args:
+        files_info: Lista de FileInfo processados (com md5_checksum preenchido)
+
+    Returns:
+        Dicionário md5 -> arquivos com o mesmo conteúdo
+    """
+    index: Dict[str, List[FileInfo]] = {}
+    for file_info in files_info:
+        if file_info.md5_checksum:
+            index.setdefault(file_info.md5_checksum, []).append(file_info)
+    return index
+
+def detect_duplicates(files_info: List[FileInfo]) -> List[DuplicateIssue]:
+    """
+    Detecta duplicados, leituras conflitantes e variações de bloco em uma passada
+
+    Quando a listagem trouxe o md5Checksum, também detecta a mesma imagem
+    enviada com nomes diferentes.
+
+    Args:
+        files_info: Lista de FileInfo processados
+
+    Returns:
+        Lista de DuplicateIssue (vazia se não houver problemas)
+    """
+    issues = []
+
+    for group in build_unit_index(files_info).values():
+        if len(group) < 2:
+            continue
+
+        first = group[0]
+        filenames = [f.filename for f in group]
+        leituras = [f.leitura for f in group]
+
+        if len(set(leituras)) > 1:
+            issue_type = IssueType.LEITURAS_CONFLITANTES
+        else:
+            issue_type = IssueType.DUPLICADO_EXATO
+        issues.append(DuplicateIssue(issue_type, first.bloco, first.apartamento, filenames, leituras))
+
+        # Blocos como "a" e "A" caem na mesma chave; sinaliza a grafia inconsistente
+        if len({f.bloco for f in group}) > 1:
+            issues.append(DuplicateIssue(
+                IssueType.VARIACAO_BLOCO, first.bloco, first.apartamento, filenames, leituras
+            ))
+
+    issues.extend(detect_content_duplicates(files_info))
+
+    return issues
+
+def detect_content_duplicates(files_info: List[FileInfo]) -> List[DuplicateIssue]:
+    """
+    Detecta imagens idênticas (mesmo md5Checksum) publicadas com nomes diferentes
+
+    Args:
+        files_info: Lista de FileInfo processados
+
+    Returns:
+        Lista de DuplicateIssue; IMAGEM_CONFLITANTE quando os nomes indicam
+        unidades ou leituras diferentes para a mesma foto
+    """
+    issues = []
+
+    for group in build_content_index(files_info).values():
+        if len(group) < 2:
+            continue
+
+        first = group[0]
+        # Nomes inválidos não indicam leitura; compara apenas os válidos
+        readings = {(unit_key(f.bloco, f.apartamento), f.leitura) for f in group if f.is_valid}
+        issue_type = IssueType.IMAGEM_CONFLITANTE if len(readings) > 1 else IssueType.IMAGEM_REPETIDA
+
+        issues.append(DuplicateIssue(
+            issue_type,
+            first.bloco,
+            first.apartamento,
+            [f.filename for f in group],
+            [f.leitura or '?' for f in group]
+        ))
+
+    return issues
@@ -6,21 +6,55 @@ Responsável por criar planilhas Excel organizadas com os dados extraídos
 import pandas as pd
 from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
 from openpyxl.utils.dataframe import dataframe_to_rows
-from typing import List, Dict, Optional
+from typing import BinaryIO, List, Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 from datetime import datetime
 import os
+import re
 
 # Importa as classes do parser
-from parser import FileInfo, CondominioType
+from parser import FileInfo, CondominioType, unit_sort_key
+from duplicate_detector import DuplicateIssue, detect_duplicates
+from unit_registry import UnitRegistry
+from filename_repair import RepairSuggestion
+from progress import CancellationToken, ProgressTracker, atomic_output, temp_output_name
+
+# Limite de linhas de uma planilha do Excel (inclui o cabeçalho)
+EXCEL_MAX_ROWS = 1_048_576
+
+# Linhas gravadas entre duas verificações de cancelamento/progresso
+WRITE_BATCH_SIZE = 5_000
+
+class ShardedReportError(ValueError):
+    """Relatório grande demais para um único arquivo, mas gravado em stream (sem pasta para as partes)"""
 
 class ExcelGenerator:
     """Gerador de planilhas Excel para dados de condomínios"""
     
-    def __init__(self):
-        """Inicializa o gerador de Excel"""
+    def __init__(self, max_rows_per_file: Optional[int] = None, max_bytes_per_file: Optional[int] = None,
+                 max_workers: Optional[int] = None, progress: Optional[ProgressTracker] = None,
+                 cancel_token: Optional[CancellationToken] = None):
+        """
+        Inicializa o gerador de Excel
+        
+        Args:
+            max_rows_per_file: Linhas de dados por arquivo antes de dividir o relatório em partes
+                               (opcional, padrão: limite de linhas do Excel)
+            max_bytes_per_file: Tamanho estimado (bytes) por arquivo antes de dividir (opcional)
+            max_workers: Processos usados para gravar as partes em paralelo (opcional)
+            progress: Acompanhamento de progresso da gravação das linhas (opcional)
+            cancel_token: Sinal de cancelamento, verificado a cada bloco de linhas (opcional)
+        """
         self.workbook = None
         self.worksheet = None
+        self.max_rows_per_file = min(max_rows_per_file or EXCEL_MAX_ROWS - 1, EXCEL_MAX_ROWS - 1)
+        self.max_bytes_per_file = max_bytes_per_file
+        self.max_workers = max_workers
+        self.progress = progress
+        self.cancel_token = cancel_token
         
         # Cores para formatação
         self.header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
@@ -32,16 +66,28 @@ class ExcelGenerator:
             bottom=Side(style='thin')
         )
     
-    def create_excel_from_files(self, files_info: List[FileInfo], output_filename: str = None) -> str:
+    def create_excel_from_files(self, files_info: List[FileInfo], output_filename: str = None,
+                                consumption: Optional[pd.DataFrame] = None,
+                                unit_registry: Optional[UnitRegistry] = None,
+                                repair_suggestions: Optional[Dict[str, RepairSuggestion]] = None,
+                                split_by_bloco: bool = False, output_stream: Optional[BinaryIO] = None) -> str:
         """
         Cria planilha Excel a partir dos dados dos arquivos
         
         Args:
             files_info: Lista de FileInfo processados
             output_filename: Nome do arquivo de saída (opcional)
+            consumption: Consumo por arquivo (ReadingHistoryStore.compute_consumption, opcional)
+            unit_registry: Cadastro de unidades para as abas Faltantes/Inesperados (opcional)
+            repair_suggestions: Sugestões de correção por nome de arquivo inválido (opcional)
+            split_by_bloco: Cria uma aba por bloco e um resumo por bloco
+            output_stream: Grava a planilha neste stream em vez do disco (ex.: upload para o Drive)
             
         Returns:
             Nome do arquivo Excel gerado
+            
+        Raises:
+            ShardedReportError: Se o relatório precisar ser dividido em partes e output_stream for usado
         """
         if not output_filename:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -58,21 +104,186 @@ class ExcelGenerator:
         # Cria o DataFrame
         df = self._create_dataframe(files_info, condominio_type)
         
-        # Adiciona dados ao Excel
-        self._add_data_to_worksheet(df)
-        
-        # Aplica formatação
-        self._apply_formatting(condominio_type)
+        # Adiciona colunas de consumo (join vetorizado pelo nome do arquivo)
+        if consumption is not None:
+            df = df.merge(consumption, on='Nome do Arquivo', how='left').fillna('')
         
-        # Adiciona estatísticas
-        self._add_statistics_sheet(files_info)
+        rows_per_shard = self._rows_per_shard(df)
+        sharded = len(df) > rows_per_shard
+        if sharded and output_stream is not None:
+            # O índice só tem links relativos para as partes, que precisam ficar ao lado dele
+            raise ShardedReportError(
+                f"Relatório com {len(df)} linhas precisa ser dividido em partes de até {rows_per_shard} linhas"
+            )
+        with_bloco_sheets = split_by_bloco and condominio_type == CondominioType.COM_BLOCOS
+        if with_bloco_sheets and sharded:
+            print("⚠️  Relatório dividido em partes: abas por bloco não são geradas (RELATORIO_POR_BLOCO ignorado)")
+            with_bloco_sheets = False
+        if self.progress:
+            self.progress.start("Gravação do relatório", len(df) * (2 if with_bloco_sheets else 1))
         
-        # Salva o arquivo
-        self.workbook.save(output_filename)
-        print(f"✅ Planilha Excel criada: {output_filename}")
+        # Partes gravadas em temporários: só substituem as da execução anterior depois
+        # que o índice for gravado, então um cancelamento no meio não mistura execuções
+        shards = []
+        try:
+            if sharded:
+                # Relatório grande: dados divididos em partes gravadas em paralelo,
+                # e o arquivo principal vira um índice das partes
+                shards = self._write_shards(df, condominio_type, output_filename, rows_per_shard)
+                self.worksheet.title = "Índice"
+                self._add_shard_index(shards)
+            else:
+                # Adiciona dados ao Excel
+                self._add_data_to_worksheet(df)
+                
+                # Aplica formatação
+                self._apply_formatting(condominio_type)
+                
+                # Abas por bloco e resumo (a ordenação já deixa cada bloco contíguo)
+                if with_bloco_sheets:
+                    self._add_bloco_sheets(df, condominio_type)
+            
+            if self.progress:
+                self.progress.finish()
+            
+            # Detecta duplicados por unidade
+            duplicate_issues = detect_duplicates(files_info)
+            
+            # Confere as unidades com o cadastro
+            unit_diff = unit_registry.diff(files_info) if unit_registry else None
+            
+            # Adiciona estatísticas
+            self._add_statistics_sheet(files_info, duplicate_issues, unit_diff, repair_suggestions)
+            
+            # Adiciona planilha de duplicados
+            self._add_duplicates_sheet(duplicate_issues)
+            
+            # Adiciona planilhas de unidades faltantes e inesperadas
+            if unit_diff:
+                self._add_unit_check_sheets(*unit_diff)
+            
+            # Salva o arquivo (ou grava direto no stream, sem arquivo local)
+            if self.cancel_token:
+                self.cancel_token.raise_if_cancelled()
+            if output_stream is not None:
+                self.workbook.save(output_stream)
+                print(f"✅ Planilha Excel gerada em memória: {output_filename}")
+            else:
+                # Temporário + rename: uma execução interrompida nunca deixa um xlsx pela metade
+                with atomic_output(output_filename) as temp_filename:
+                    self.workbook.save(temp_filename)
+                    # Índice gravado: as partes novas substituem as anteriores antes dele
+                    for shard in shards:
+                        os.replace(shard['temp_filename'], shard['filename'])
+                print(f"✅ Planilha Excel criada: {output_filename}")
+        finally:
+            for shard in shards:
+                if os.path.exists(shard['temp_filename']):
+                    os.remove(shard['temp_filename'])
         
         return output_filename
     
+    def _rows_per_shard(self, df: pd.DataFrame) -> int:
+        """Calcula quantas linhas cabem em cada parte (limite de linhas e, se definido, de bytes)"""
+        rows = self.max_rows_per_file
+        
+        if self.max_bytes_per_file and len(df) > 0:
+            bytes_per_row = df.memory_usage(index=False, deep=True).sum() / len(df)
+            rows = min(rows, max(1, int(self.max_bytes_per_file / bytes_per_row)))
+        
+        return rows
+    
+    def _write_shards(self, df: pd.DataFrame, condominio_type: CondominioType,
+                      output_filename: str, rows_per_shard: int) -> List[Dict]:
+        """
+        Grava as partes do relatório em paralelo, uma por processo
+        
+        Cada parte é gravada em um arquivo temporário ('temp_filename' de cada parte);
+        quem chama renomeia as partes para 'filename' depois de gravar o índice.
+        """
+        base, extension = os.path.splitext(output_filename)
+        
+        jobs = []
+        for part, start in enumerate(range(0, len(df), rows_per_shard), 1):
+            chunk = df.iloc[start:start + rows_per_shard]
+            filename = f"{base}_parte_{part:03d}{extension or '.xlsx'}"
+            jobs.append((filename, temp_output_name(filename), chunk))
+        
+        print(f"📦 Relatório dividido em {len(jobs)} partes de até {rows_per_shard} linhas")
+        
+        if self.cancel_token:
+            self.cancel_token.raise_if_cancelled()
+        # spawn: o serviço de fila tem outras threads segurando locks (stdout, sqlite, http)
+        # no momento do fork, e um filho criado com fork pode travar em um deles
+        with ProcessPoolExecutor(max_workers=self.max_workers,
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = [
+                executor.submit(_write_shard, temp_filename, chunk, condominio_type)
+                for _, temp_filename, chunk in jobs
+            ]
+            try:
+                # Progresso e cancelamento verificados a cada parte concluída, na ordem das partes
+                for (_, _, chunk), future in zip(jobs, futures):
+                    future.result()
+                    if self.progress:
+                        self.progress.advance(len(chunk))
+                    if self.cancel_token:
+                        self.cancel_token.raise_if_cancelled()
+            except BaseException:
+                # Partes ainda na fila não chegam a ser gravadas; as que já estão
+                # em andamento terminam antes de os temporários serem removidos
+                executor.shutdown(wait=True, cancel_futures=True)
+                for _, temp_filename, _ in jobs:
+                    if os.path.exists(temp_filename):
+                        os.remove(temp_filename)
+                raise
+        
+        shards = []
+        for filename, temp_filename, chunk in jobs:
+            first, last = chunk.iloc[0], chunk.iloc[-1]
+            shards.append({
+                'filename': filename,
+                'temp_filename': temp_filename,
+                'rows': len(chunk),
+                'first': self._unit_label(first),
+                'last': self._unit_label(last),
+            })
+        
+        return shards
+    
+    def _add_shard_index(self, shards: List[Dict]):
+        """Preenche a aba de índice com links para as partes do relatório"""
+        index_data = [["Parte", "Arquivo", "Linhas", "Primeira Unidade", "Última Unidade"]]
+        for part, shard in enumerate(shards, 1):
+            index_data.append([
+                part, os.path.basename(shard['filename']), shard['rows'], shard['first'], shard['last']
+            ])
+        
+        for row_num, row_data in enumerate(index_data, 1):
+            for col_num, value in enumerate(row_data, 1):
+                cell = self.worksheet.cell(row=row_num, column=col_num, value=value)
+                
+                # Formata cabeçalho
+                if row_num == 1:
+                    cell.font = self.header_font
+                    cell.fill = self.header_fill
+                elif col_num == 2:
+                    # Link relativo: as partes ficam na mesma pasta do índice
+                    cell.hyperlink = value
+                    cell.style = "Hyperlink"
+                
+                cell.border = self.border
+        
+        for col_num, width in enumerate([8, 45, 12, 20, 20], 1):
+            self.worksheet.column_dimensions[get_column_letter(col_num)].width = width
+    
+    @staticmethod
+    def _unit_label(row: pd.Series) -> str:
+        """Rótulo bloco-apartamento de uma linha do relatório"""
+        if 'Bloco' in row:
+            return f"{row['Bloco']}-{row['Apartamento']}"
+        return str(row['Apartamento'])
+    
     def _determine_condominio_type(self, files_info: List[FileInfo]) -> CondominioType:
         """Determina o tipo de condomínio baseado nos dados"""
         valid_files = [f for f in files_info if f.is_valid]
@@ -92,10 +303,13 @@ class ExcelGenerator:
         """Cria DataFrame pandas com os dados organizados"""
         data = []
         
-        for file_info in files_info:
-            if not file_info.is_valid:
-                continue
-                
+        # Colunas de metadados só aparecem quando a listagem trouxe esses dados
+        valid_files = [f for f in files_info if f.is_valid]
+        has_capture_time = any(f.capture_time for f in valid_files)
+        has_resolution = any(f.width for f in valid_files)
+        has_window = any(f.capture_in_window is not None for f in valid_files)
+        
+        for file_info in valid_files:
             row = {
                 'Nome do Arquivo': file_info.filename,
                 'Apartamento': file_info.apartamento,
@@ -106,59 +320,129 @@ class ExcelGenerator:
             if condominio_type == CondominioType.COM_BLOCOS:
                 row['Bloco'] = file_info.bloco if file_info.bloco else 'N/A'
             
+            if has_capture_time:
+                capture_time = file_info.capture_time
+                row['Data da Foto'] = capture_time.strftime("%d/%m/%Y %H:%M") if capture_time else ''
+            if has_resolution:
+                row['Resolução'] = f"{file_info.width}x{file_info.height}" if file_info.width else ''
+            if has_window:
+                row['Janela de Faturamento'] = {True: 'Dentro', False: 'Fora', None: ''}[file_info.capture_in_window]
+            
             data.append(row)
         
-        # Cria DataFrame
-        df = pd.DataFrame(data)
-        
         # Reorganiza colunas
         if condominio_type == CondominioType.COM_BLOCOS:
-            df = df[['Nome do Arquivo', 'Bloco', 'Apartamento', 'Leitura']]
+            columns = ['Nome do Arquivo', 'Bloco', 'Apartamento', 'Leitura']
         else:
-            df = df[['Nome do Arquivo', 'Apartamento', 'Leitura']]
+            columns = ['Nome do Arquivo', 'Apartamento', 'Leitura']
+        
+        if has_capture_time:
+            columns.append('Data da Foto')
+        if has_resolution:
+            columns.append('Resolução')
+        if has_window:
+            columns.append('Janela de Faturamento')
+        
+        # Cria DataFrame
+        df = pd.DataFrame(data, columns=columns)
+        
+        # Ordena por bloco/apartamento com chaves inteiras pré-calculadas
+        # (a ordem textual colocaria "1001" antes de "201")
+        sort_columns = ['_bloco_texto', '_bloco_num', '_bloco_nome', '_apartamento']
+        keys = pd.DataFrame(
+            [unit_sort_key(f.bloco, f.apartamento) for f in valid_files],
+            columns=sort_columns
+        )
+        order = keys.sort_values(sort_columns, kind='mergesort').index
+        df = df.iloc[order].reset_index(drop=True)
         
         return df
     
-    def _add_data_to_worksheet(self, df: pd.DataFrame):
-        """Adiciona dados do DataFrame ao worksheet"""
+    def _add_data_to_worksheet(self, df: pd.DataFrame, worksheet=None):
+        """Adiciona dados do DataFrame ao worksheet (padrão: aba principal)"""
+        if worksheet is None:
+            worksheet = self.worksheet
+        
         # Adiciona cabeçalho
         for col_num, column_title in enumerate(df.columns, 1):
-            cell = self.worksheet.cell(row=1, column=col_num, value=column_title)
+            cell = worksheet.cell(row=1, column=col_num, value=column_title)
             cell.font = self.header_font
             cell.fill = self.header_fill
             cell.alignment = Alignment(horizontal="center", vertical="center")
             cell.border = self.border
         
-        # Adiciona dados
-        for row_num, row_data in enumerate(dataframe_to_rows(df, index=False, header=False), 2):
-            for col_num, value in enumerate(row_data, 1):
-                cell = self.worksheet.cell(row=row_num, column=col_num, value=value)
-                cell.border = self.border
-                cell.alignment = Alignment(horizontal="center", vertical="center")
+        # Adiciona dados em blocos (cancelamento e progresso verificados entre os blocos)
+        for start in range(0, len(df), WRITE_BATCH_SIZE):
+            if self.cancel_token:
+                self.cancel_token.raise_if_cancelled()
+            
+            chunk = df.iloc[start:start + WRITE_BATCH_SIZE]
+            for row_num, row_data in enumerate(dataframe_to_rows(chunk, index=False, header=False), start + 2):
+                for col_num, value in enumerate(row_data, 1):
+                    cell = worksheet.cell(row=row_num, column=col_num, value=value)
+                    cell.border = self.border
+                    cell.alignment = Alignment(horizontal="center", vertical="center")
+            
+            if self.progress:
+                self.progress.advance(len(chunk))
     
-    def _apply_formatting(self, condominio_type: CondominioType):
-        """Aplica formatação ao worksheet"""
+    def _apply_formatting(self, condominio_type: CondominioType, worksheet=None):
+        """Aplica formatação ao worksheet (padrão: aba principal)"""
+        if worksheet is None:
+            worksheet = self.worksheet
+        
         # Ajusta largura das colunas
         column_widths = {
             'Nome do Arquivo': 30,
             'Bloco': 10,
             'Apartamento': 15,
-            'Leitura': 15
+            'Leitura': 15,
+            'Data da Foto': 18,
+            'Resolução': 12,
+            'Janela de Faturamento': 22,
+            'Leitura Anterior': 16,
+            'Consumo': 12,
+            'Anomalia': 32
         }
         
-        for col_num, column_title in enumerate(self.worksheet[1], 1):
+        for col_num, column_title in enumerate(worksheet[1], 1):
             if column_title.value in column_widths:
-                self.worksheet.column_dimensions[column_title.column_letter].width = column_widths[column_title.value]
+                worksheet.column_dimensions[column_title.column_letter].width = column_widths[column_title.value]
         
         # Remove coluna de bloco se não for necessária
         if condominio_type == CondominioType.SEM_BLOCOS:
             # Encontra a coluna do bloco e remove
-            for col_num, column_title in enumerate(self.worksheet[1], 1):
+            for col_num, column_title in enumerate(worksheet[1], 1):
                 if column_title.value == 'Bloco':
-                    self.worksheet.delete_cols(col_num)
+                    worksheet.delete_cols(col_num)
                     break
     
-    def _add_statistics_sheet(self, files_info: List[FileInfo]):
+    def _add_bloco_sheets(self, df: pd.DataFrame, condominio_type: CondominioType):
+        """Adiciona uma aba por bloco e o resumo por bloco, calculados em um único agrupamento"""
+        bloco_key = df['Bloco'].str.upper()
+        leituras = pd.to_numeric(df['Leitura'], errors='coerce')
+        
+        summary = [["Bloco", "Fotos", "Soma das Leituras"]]
+        for bloco, group in df.groupby(bloco_key, sort=False):
+            bloco_ws = self.workbook.create_sheet(self._safe_sheet_title(f"Bloco {bloco}"))
+            self._add_data_to_worksheet(group, bloco_ws)
+            self._apply_formatting(condominio_type, bloco_ws)
+            summary.append([bloco, len(group), int(leituras.loc[group.index].sum())])
+        
+        self._add_table_sheet("Resumo por Bloco", summary, [15, 12, 20])
+    
+    def _safe_sheet_title(self, title: str) -> str:
+        """Remove caracteres proibidos, limita a 31 caracteres e evita nomes repetidos"""
+        title = re.sub(r'[\\/*?:\[\]]', '_', title)[:31]
+        candidate, suffix = title, 2
+        while candidate in self.workbook.sheetnames:
+            candidate = f"{title[:28]}_{suffix}"
+            suffix += 1
+        return candidate
+
+    def _add_statistics_sheet(self, files_info: List[FileInfo], duplicate_issues: List[DuplicateIssue],
+                              unit_diff: Optional[Tuple[list, list]] = None,
+                              repair_suggestions: Optional[Dict[str, RepairSuggestion]] = None):
         """Adiciona planilha de estatísticas"""
         stats_ws = self.workbook.create_sheet("Estatísticas")
         
@@ -180,15 +464,23 @@ class ExcelGenerator:
             ["COM Blocos", with_blocks],
             ["SEM Blocos", without_blocks],
             ["Taxa de Sucesso", f"{(valid_files/total_files*100):.1f}%" if total_files > 0 else "0%"],
+            ["Problemas de Duplicidade", len(duplicate_issues)],
+            ["Fotos Fora da Janela", sum(1 for f in files_info if f.capture_in_window is False)],
+            ["Unidades Faltantes", len(unit_diff[0]) if unit_diff else "N/A"],
+            ["Unidades Inesperadas", len(unit_diff[1]) if unit_diff else "N/A"],
             ["", ""],
             ["Data de Geração", datetime.now().strftime("%d/%m/%Y %H:%M:%S")],
-            ["Arquivos com Erro", ""]
+            ["Arquivos com Erro", "", "Sugestão de Correção", "Confiança"] if repair_suggestions else ["Arquivos com Erro", ""]
         ]
         
-        # Adiciona arquivos com erro
+        # Adiciona arquivos com erro (com a sugestão de correção, quando houver)
         error_files = [f.filename for f in files_info if not f.is_valid]
         for error_file in error_files:
-            stats_data.append(["", error_file])
+            suggestion = repair_suggestions.get(error_file) if repair_suggestions else None
+            if suggestion:
+                stats_data.append(["", error_file, suggestion.suggestion, suggestion.confidence])
+            else:
+                stats_data.append(["", error_file])
         
         # Adiciona dados ao worksheet
         for row_num, row_data in enumerate(stats_data, 1):
@@ -205,21 +497,119 @@ class ExcelGenerator:
         # Ajusta largura das colunas
         stats_ws.column_dimensions['A'].width = 25
         stats_ws.column_dimensions['B'].width = 30
+        if repair_suggestions:
+            stats_ws.column_dimensions['C'].width = 30
+            stats_ws.column_dimensions['D'].width = 12
+
+    def _add_duplicates_sheet(self, duplicate_issues: List[DuplicateIssue]):
+        """Adiciona planilha com duplicados e leituras conflitantes"""
+        dup_data = [["Tipo", "Bloco", "Apartamento", "Leituras", "Arquivos"]]
+        for issue in duplicate_issues:
+            dup_data.append([
+                issue.issue_type.value,
+                issue.bloco if issue.bloco else 'N/A',
+                issue.apartamento,
+                ", ".join(issue.leituras),
+                ", ".join(issue.filenames)
+            ])
+        
+        if not duplicate_issues:
+            dup_data.append(["Nenhum duplicado encontrado", "", "", "", ""])
+        
+        self._add_table_sheet("Duplicados", dup_data, [30, 10, 15, 25, 50])
+    
+    def _add_unit_check_sheets(self, missing: List[Tuple[Optional[str], str]], unexpected: List[FileInfo]):
+        """Adiciona planilhas de unidades faltantes e inesperadas"""
+        missing_data = [["Bloco", "Apartamento"]]
+        for bloco, apartamento in missing:
+            missing_data.append([bloco if bloco else 'N/A', apartamento])
+        if not missing:
+            missing_data.append(["Todas as unidades têm foto", ""])
+        
+        self._add_table_sheet("Faltantes", missing_data, [25, 15])
+        
+        unexpected_data = [["Nome do Arquivo", "Bloco", "Apartamento", "Leitura"]]
+        for file_info in unexpected:
+            unexpected_data.append([
+                file_info.filename,
+                file_info.bloco if file_info.bloco else 'N/A',
+                file_info.apartamento,
+                file_info.leitura
+            ])
+        if not unexpected:
+            unexpected_data.append(["Nenhuma unidade fora do cadastro", "", "", ""])
+        
+        self._add_table_sheet("Inesperados", unexpected_data, [35, 10, 15, 15])
+    
+    def _add_table_sheet(self, title: str, table_data: List[list], column_widths: List[int]):
+        """Adiciona uma planilha simples com cabeçalho formatado na primeira linha"""
+        ws = self.workbook.create_sheet(title)
+        
+        # Adiciona dados ao worksheet
+        for row_num, row_data in enumerate(table_data, 1):
+            for col_num, value in enumerate(row_data, 1):
+                cell = ws.cell(row=row_num, column=col_num, value=value)
+                
+                # Formata cabeçalho
+                if row_num == 1:
+                    cell.font = self.header_font
+                    cell.fill = self.header_fill
+                
+                cell.border = self.border
+        
+        # Ajusta largura das colunas
+        for col_num, width in enumerate(column_widths, 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = width
+
+def _write_shard(filename: str, df: pd.DataFrame, condominio_type: CondominioType) -> str:
+    """Grava uma parte do relatório em filename (executado em um processo separado)"""
+    generator = ExcelGenerator()
+    generator.workbook = Workbook()
+    generator.worksheet = generator.workbook.active
+    generator.worksheet.title = "Dados Extraídos"
+    
+    generator._add_data_to_worksheet(df)
+    generator._apply_formatting(condominio_type)
+    generator.workbook.save(filename)
+    
+    return filename
 
 # Função de conveniência para uso direto
-def generate_excel_report(files_info: List[FileInfo], output_filename: str = None) -> str:
+def generate_excel_report(files_info: List[FileInfo], output_filename: str = None,
+                          consumption: Optional[pd.DataFrame] = None,
+                          unit_registry: Optional[UnitRegistry] = None,
+                          repair_suggestions: Optional[Dict[str, RepairSuggestion]] = None,
+                          split_by_bloco: bool = False, output_stream: Optional[BinaryIO] = None,
+                          progress: Optional[ProgressTracker] = None,
+                          cancel_token: Optional[CancellationToken] = None,
+                          max_rows_per_file: Optional[int] = None, max_bytes_per_file: Optional[int] = None,
+                          max_workers: Optional[int] = None) -> str:
     """
     Função simples para gerar relatório Excel
     
     Args:
         files_info: Lista de FileInfo processados
         output_filename: Nome do arquivo de saída (opcional)
+        consumption: Consumo por arquivo (opcional)
+        unit_registry: Cadastro de unidades do condomínio (opcional)
+        repair_suggestions: Sugestões de correção dos arquivos inválidos (opcional)
+        split_by_bloco: Cria uma aba por bloco e um resumo por bloco
+        output_stream: Grava a planilha neste stream em vez do disco (opcional)
+        progress: Acompanhamento de progresso da gravação (opcional)
+        cancel_token: Sinal de cancelamento (opcional)
+        max_rows_per_file: Linhas por arquivo antes de dividir o relatório em partes (opcional)
+        max_bytes_per_file: Tamanho estimado (bytes) por arquivo antes de dividir (opcional)
+        max_workers: Processos usados para gravar as partes (opcional)
         
     Returns:
         Nome do arquivo Excel gerado
     """
-    generator = ExcelGenerator()
-    return generator.create_excel_from_files(files_info, output_filename)
+    generator = ExcelGenerator(max_rows_per_file, max_bytes_per_file, max_workers,
+                               progress=progress, cancel_token=cancel_token)
+    return generator.create_excel_from_files(
+        files_info, output_filename, consumption, unit_registry, repair_suggestions, split_by_bloco,
+        output_stream
+    )
 
 if __name__ == "__main__":
     # Teste básico da classe
@@ -0,0 +1,154 @@
+"""
+Sugestões de correção para Extract Fotos
+Responsável por propor nomes corrigidos para arquivos fora do padrão
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from parser import FileInfo, FileNameParser, unit_key
+from unit_registry import UnitRegistry
+
+# Separadores trocados por hífen (espaço, sublinhado, ponto, vírgula, hífens repetidos)
+SEPARATORS_RE = re.compile(r'[\s_.,;-]+')
+
+# Bloco colado no apartamento: "A101-1234" -> "A-101-1234"
+GLUED_BLOCK_RE = re.compile(r'^([A-Za-z]+)(\d+)-(\d+)$')
+
+# Letras digitadas no lugar de números (O -> 0, I/l -> 1)
+DIGIT_TYPOS = str.maketrans({'O': '0', 'o': '0', 'I': '1', 'l': '1'})
+
+# Extensão do arquivo
+EXTENSION_RE = re.compile(r'(\.\w+)$')
+
+class Confidence:
+    """Níveis de confiança das sugestões"""
+    ALTA = "Alta"     # Unidade corrigida existe no cadastro
+    MEDIA = "Média"   # Unidade a uma edição de distância de uma unidade cadastrada
+    BAIXA = "Baixa"   # Formato corrigido, sem cadastro para conferir
+
+@dataclass
+class RepairSuggestion:
+    """Sugestão de nome corrigido para um arquivo inválido"""
+    filename: str
+    suggestion: str
+    confidence: str
+
+class FilenameRepairer:
+    """Gera nomes normalizados e confere as unidades com índices pré-calculados do cadastro"""
+
+    def __init__(self, parser: FileNameParser, unit_registry: Optional[UnitRegistry] = None):
+        """
+        Inicializa o reparador
+
+        Args:
+            parser: Parser com os padrões do condomínio
+            unit_registry: Cadastro de unidades (opcional)
+        """
+        self.parser = parser
+        self.unit_registry = unit_registry
+
+        # Índice de vizinhança (symmetric delete): cada rótulo com uma letra removida
+        # aponta para as unidades cadastradas; consulta em O(tamanho do rótulo)
+        self._neighbors: Dict[str, Set[Tuple[str, str]]] = {}
+        if unit_registry:
+            for key in unit_registry.units:
+                for variant in self._deletion_variants(self._label(key)):
+                    self._neighbors.setdefault(variant, set()).add(key)
+
+    def suggest(self, filename: str) -> Optional[RepairSuggestion]:
+        """
+        Propõe um nome corrigido para um arquivo inválido
+
+        Args:
+            filename: Nome do arquivo fora do padrão
+
+        Returns:
+            RepairSuggestion ou None se nenhum candidato for válido
+        """
+        match = EXTENSION_RE.search(filename)
+        extension = match.group(1) if match else ''
+        stem = filename[:-len(extension)] if extension else filename
+
+        fallback = None
+        for candidate in self._candidates(stem):
+            file_info = self.parser.parse_filename(candidate + extension)
+            if not file_info.is_valid:
+                continue
+
+            if not self.unit_registry:
+                return RepairSuggestion(filename, file_info.filename, Confidence.BAIXA)
+
+            key = unit_key(file_info.bloco, file_info.apartamento)
+            if key in self.unit_registry:
+                return RepairSuggestion(filename, file_info.filename, Confidence.ALTA)
+
+            if fallback is None:
+                fallback = self._suggest_neighbor(filename, file_info, extension)
+
+        return fallback
+
+    def suggest_all(self, files_info: List[FileInfo]) -> Dict[str, RepairSuggestion]:
+        """
+        Gera sugestões para todos os arquivos inválidos
+
+        Returns:
+            Dicionário nome do arquivo -> sugestão (apenas arquivos com sugestão)
+        """
+        suggestions = {}
+        for file_info in files_info:
+            if file_info.is_valid or file_info.filename in suggestions:
+                continue
+            suggestion = self.suggest(file_info.filename)
+            if suggestion:
+                suggestions[file_info.filename] = suggestion
+        return suggestions
+
+    def _candidates(self, stem: str) -> List[str]:
+        """Gera candidatos normalizados, do mais conservador ao mais agressivo"""
+        candidates = []
+
+        normalized = SEPARATORS_RE.sub('-', stem.strip()).strip('-')
+        candidates.append(normalized)
+
+        glued = GLUED_BLOCK_RE.match(normalized)
+        if glued:
+            candidates.append('-'.join(glued.groups()))
+
+        # Corrige letras no lugar de números, preservando o primeiro campo (bloco)
+        if '-' in normalized:
+            head, tail = normalized.split('-', 1)
+            candidates.append(head + '-' + tail.translate(DIGIT_TYPOS))
+
+        # Remove repetidos preservando a ordem
+        return list(dict.fromkeys(c for c in candidates if c and c != stem))
+
+    def _suggest_neighbor(self, filename: str, file_info: FileInfo, extension: str) -> RepairSuggestion:
+        """Procura uma unidade cadastrada a uma edição de distância"""
+        label = self._label(unit_key(file_info.bloco, file_info.apartamento))
+
+        matches: Set[Tuple[str, str]] = set()
+        for variant in self._deletion_variants(label):
+            matches.update(self._neighbors.get(variant, ()))
+
+        if len(matches) == 1:
+            bloco, apartamento = self.unit_registry.units[matches.pop()]
+            prefix = f"{bloco}-" if bloco else ''
+            return RepairSuggestion(
+                filename, f"{prefix}{apartamento}-{file_info.leitura}{extension}", Confidence.MEDIA
+            )
+
+        # Sem vizinho único: sugere apenas o formato corrigido
+        return RepairSuggestion(filename, file_info.filename, Confidence.BAIXA)
+
+    @staticmethod
+    def _label(key: Tuple[str, str]) -> str:
+        """Rótulo textual da unidade usado no índice de vizinhança"""
+        bloco, apartamento = key
+        return f"{bloco}-{apartamento}" if bloco else apartamento
+
+    @staticmethod
+    def _deletion_variants(label: str) -> Set[str]:
+        """O próprio rótulo e todas as variações com um caractere removido"""
+        return {label} | {label[:i] + label[i + 1:] for i in range(len(label))}
@@ -5,10 +5,32 @@ Responsável por conectar e listar arquivos do Google Drive usando Service Accou
 
 import os
 import json
-from typing import List, Dict, Optional
+import time
+import threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import BinaryIO, Callable, List, Dict, Optional, Tuple
+import httplib2
+import google_auth_httplib2
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
+
+from photo_store import LocalPhotoStore
+from progress import CancellationToken, ProgressTracker
+
+# Tamanho dos blocos de download (bytes)
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Tamanho dos blocos do upload retomável (múltiplo de 256 KB exigido pela API)
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Tipos MIME dos relatórios enviados ao Drive
+REPORT_MIME_TYPES = {
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.csv': 'text/csv',
+}
 
 # Escopos necessários para acessar o Google Drive
 # 'drive.readonly' = só leitura
@@ -21,6 +43,9 @@ class GoogleDriveClient:
     def __init__(self):
         """Inicializa o cliente Google Drive com Service Account"""
         self.service = None
+        self.credentials = None
+        self.api_endpoint = os.getenv('GOOGLE_DRIVE_API_ENDPOINT', '').strip() or None
+        self._thread_local = threading.local()
         self._authenticate()
     
     def _authenticate(self):
@@ -45,13 +70,14 @@ class GoogleDriveClient:
                 )
             
             # Cria credenciais da Service Account
-            credentials = service_account.Credentials.from_service_account_info(
+            self.credentials = service_account.Credentials.from_service_account_info(
                 credentials_dict, 
                 scopes=SCOPES
             )
             
-            # Cria o serviço do Google Drive
-            self.service = build('drive', 'v3', credentials=credentials)
+            # Cria o serviço do Google Drive (endpoint alternativo opcional, ex.: servidor de teste local)
+            client_options = {'api_endpoint': self.api_endpoint} if self.api_endpoint else None
+            self.service = build('drive', 'v3', credentials=self.credentials, client_options=client_options)
             
             print("✅ Autenticação com Service Account realizada com sucesso!")
             
@@ -59,15 +85,22 @@ class GoogleDriveClient:
             print(f"❌ Erro na autenticação: {e}")
             raise
     
-    def list_files_in_folder(self, folder_id: str) -> List[Dict]:
+    def list_files_in_folder(self, folder_id: str, include_checksum: bool = False,
+                             include_media_metadata: bool = False,
+                             progress: Optional[ProgressTracker] = None,
+                             cancel_token: Optional[CancellationToken] = None) -> List[Dict]:
         """
         Lista todos os arquivos de imagem em uma pasta específica
         
         Args:
             folder_id: ID da pasta no Google Drive
+            include_checksum: Inclui o md5Checksum na listagem (deduplicação por conteúdo)
+            include_media_metadata: Inclui createdTime e imageMediaMetadata (data da foto e resolução)
+            progress: Acompanhamento de progresso, avançado a cada página (opcional)
+            cancel_token: Sinal de cancelamento, verificado antes de cada página (opcional)
             
         Returns:
-            Lista de arquivos com informações (id, name, mimeType)
+            Lista de arquivos com informações (id, name, mimeType, size e opcionalmente md5Checksum)
         """
         try:
             # Tipos MIME de imagens suportadas
@@ -81,26 +114,43 @@ class GoogleDriveClient:
             ]
             
             # Query para buscar apenas arquivos de imagem na pasta
-            query = f"'{folder_id}' in parents and trashed=false and ({' or '.join([f'mimeType=\'{mime}\'' for mime in image_mime_types])})"
+            mime_filter = ' or '.join(f"mimeType='{mime}'" for mime in image_mime_types)
+            query = f"'{folder_id}' in parents and trashed=false and ({mime_filter})"
+            
+            # Campos retornados (checksum e metadados vêm na própria listagem, sem download)
+            file_fields = ['id', 'name', 'mimeType', 'size']
+            if include_checksum:
+                file_fields.append('md5Checksum')
+            if include_media_metadata:
+                file_fields.extend(['createdTime', 'imageMediaMetadata(time, width, height)'])
             
             results = []
             page_token = None
+            if progress:
+                progress.start("Listagem")
             
             while True:
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
+                
                 response = self.service.files().list(
                     q=query,
                     spaces='drive',
-                    fields='nextPageToken, files(id, name, mimeType, size)',
+                    fields=f"nextPageToken, files({', '.join(file_fields)})",
                     pageToken=page_token
-                ).execute()
+                ).execute(http=self._get_thread_http())
                 
                 files = response.get('files', [])
                 results.extend(files)
+                if progress:
+                    progress.advance(len(files))
                 
                 page_token = response.get('nextPageToken', None)
                 if page_token is None:
                     break
             
+            if progress:
+                progress.finish()
             print(f"✅ Encontrados {len(results)} arquivos de imagem na pasta")
             return results
             
@@ -122,7 +172,7 @@ class GoogleDriveClient:
             file = self.service.files().get(
                 fileId=file_id,
                 fields='id, name, mimeType, size, createdTime, modifiedTime'
-            ).execute()
+            ).execute(http=self._get_thread_http())
             
             return file
             
@@ -130,6 +180,258 @@ class GoogleDriveClient:
             print(f"❌ Erro ao obter informações do arquivo {file_id}: {error}")
             return None
     
+    def get_start_page_token(self) -> str:
+        """Obtém o token inicial da Changes API (alterações a partir de agora)"""
+        response = self.service.changes().getStartPageToken(
+            supportsAllDrives=True
+        ).execute(http=self._get_thread_http())
+        return response['startPageToken']
+    
+    def list_changes(self, page_token: str) -> Tuple[List[Dict], str]:
+        """
+        Lista as alterações desde o token informado (todas as páginas)
+        
+        Args:
+            page_token: Token salvo na consulta anterior
+            
+        Returns:
+            Tupla (alterações, token para a próxima consulta)
+        """
+        changes = []
+        while True:
+            response = self.service.changes().list(
+                pageToken=page_token,
+                spaces='drive',
+                pageSize=1000,
+                includeRemoved=True,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+                fields='nextPageToken, newStartPageToken, '
+                       'changes(fileId, removed, file(name, mimeType, parents, trashed))'
+            ).execute(http=self._get_thread_http())
+            
+            changes.extend(response.get('changes', []))
+            if 'newStartPageToken' in response:
+                return changes, response['newStartPageToken']
+            page_token = response['nextPageToken']
+    
+    def has_changes_since(self, folder_id: str, since: str) -> bool:
+        """
+        Verifica se alguma imagem da pasta foi criada ou alterada desde um instante
+        
+        Consulta mais simples que a Changes API, mas não percebe exclusões.
+        
+        Args:
+            folder_id: ID da pasta no Google Drive
+            since: Instante RFC 3339 (ex.: 2025-08-01T03:00:00Z)
+            
+        Returns:
+            True se houver ao menos uma imagem modificada
+        """
+        response = self.service.files().list(
+            q=f"'{folder_id}' in parents and mimeType contains 'image/' and modifiedTime > '{since}'",
+            spaces='drive',
+            fields='files(id)',
+            pageSize=1,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True
+        ).execute(http=self._get_thread_http())
+        return bool(response.get('files'))
+    
+    def find_file_by_name(self, folder_id: str, name: str) -> Optional[str]:
+        """
+        Procura um arquivo pelo nome dentro de uma pasta
+        
+        Args:
+            folder_id: ID da pasta no Google Drive
+            name: Nome exato do arquivo
+            
+        Returns:
+            ID do arquivo ou None se não existir
+        """
+        escaped_name = name.replace("\\", "\\\\").replace("'", "\\'")
+        response = self.service.files().list(
+            q=f"'{folder_id}' in parents and name='{escaped_name}' and trashed=false",
+            spaces='drive',
+            fields='files(id, name)',
+            pageSize=1,
+            supportsAllDrives=True,
+            includeItemsFromAllDrives=True
+        ).execute(http=self._get_thread_http())
+        
+        files = response.get('files', [])
+        return files[0]['id'] if files else None
+    
+    def upload_report(self, stream: BinaryIO, name: str, folder_id: str, file_id: Optional[str] = None,
+                      progress_callback: Optional[Callable[[int, int], None]] = None,
+                      cancel_token: Optional[CancellationToken] = None) -> str:
+        """
+        Envia um relatório direto da memória para o Drive em upload retomável por blocos
+        
+        Se já existir um relatório com o mesmo nome na pasta, o conteúdo é atualizado
+        no mesmo arquivo (o ID e os links compartilhados continuam valendo).
+        
+        Args:
+            stream: Conteúdo do relatório (ex.: io.BytesIO)
+            name: Nome do arquivo no Drive (.xlsx ou .csv)
+            folder_id: Pasta de destino no Google Drive
+            file_id: ID do relatório anterior (opcional, procura pelo nome na pasta)
+            progress_callback: Função chamada com (bytes enviados, total)
+            cancel_token: Sinal de cancelamento, verificado entre os blocos (o arquivo anterior
+                          só é substituído quando o último bloco é enviado)
+            
+        Returns:
+            ID do arquivo no Google Drive
+        """
+        mime_type = REPORT_MIME_TYPES.get(os.path.splitext(name)[1].lower(), 'application/octet-stream')
+        stream.seek(0)
+        media = MediaIoBaseUpload(stream, mimetype=mime_type, chunksize=UPLOAD_CHUNK_SIZE, resumable=True)
+        
+        file_id = file_id or self.find_file_by_name(folder_id, name)
+        if file_id:
+            request = self.service.files().update(
+                fileId=file_id, media_body=media, fields='id', supportsAllDrives=True
+            )
+        else:
+            request = self.service.files().create(
+                body={'name': name, 'parents': [folder_id]},
+                media_body=media, fields='id', supportsAllDrives=True
+            )
+        request.http = self._get_thread_http()
+        
+        # A biblioteca troca só o host da URL de upload; com endpoint alternativo, troca também o esquema
+        if self.api_endpoint:
+            endpoint = urlparse(self.api_endpoint)
+            request.uri = urlparse(request.uri)._replace(scheme=endpoint.scheme, netloc=endpoint.netloc).geturl()
+        
+        response = None
+        while response is None:
+            if cancel_token:
+                cancel_token.raise_if_cancelled()
+            status, response = request.next_chunk(num_retries=3)
+            if status and progress_callback:
+                progress_callback(status.resumable_progress, status.total_size)
+        
+        if progress_callback:
+            progress_callback(media.size(), media.size())
+        
+        return response['id']
+    
+    def download_files(self, files: List[Dict], store: Optional[LocalPhotoStore] = None,
+                       max_workers: int = 4, max_retries: int = 3,
+                       progress_callback: Optional[Callable[[int, int, int], None]] = None) -> Dict[str, str]:
+        """
+        Baixa as fotos em paralelo para o armazenamento local endereçado por md5
+        
+        Fotos já presentes no armazenamento não são baixadas novamente, e arquivos
+        com o mesmo conteúdo são baixados uma única vez. Cada download é gravado em
+        blocos direto no disco e retomado do ponto em que parou em caso de falha.
+        
+        Args:
+            files: Arquivos da listagem (precisam de md5Checksum: use include_checksum=True)
+            store: Armazenamento local (opcional, usa a pasta padrão)
+            max_workers: Número de downloads simultâneos
+            max_retries: Tentativas por arquivo antes de desistir
+            progress_callback: Função chamada com (concluídos, total, bytes baixados)
+            
+        Returns:
+            Dicionário file_id -> caminho local da foto (arquivos com falha ficam de fora)
+        """
+        store = store or LocalPhotoStore()
+        
+        # Agrupa por conteúdo: cada md5 é baixado uma única vez
+        by_checksum: Dict[str, List[Dict]] = {}
+        for file in files:
+            if not file.get('md5Checksum'):
+                print(f"⚠️  Arquivo sem md5Checksum ignorado: {file.get('name')}")
+                continue
+            by_checksum.setdefault(file['md5Checksum'], []).append(file)
+        
+        results: Dict[str, str] = {}
+        pending = []
+        for checksum, group in by_checksum.items():
+            mime_type = group[0].get('mimeType')
+            if store.has(checksum, mime_type):
+                path = str(store.path_for(checksum, mime_type))
+                results.update({file['id']: path for file in group})
+            else:
+                pending.append(group)
+        
+        total = len(pending)
+        completed = 0
+        downloaded_bytes = 0
+        print(f"📥 {len(by_checksum) - total} fotos já em cache, {total} para baixar")
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self._download_with_retry, group[0], store, max_retries): group
+                for group in pending
+            }
+            
+            for future in as_completed(futures):
+                group = futures[future]
+                completed += 1
+                try:
+                    path, size = future.result()
+                    downloaded_bytes += size
+                    results.update({file['id']: path for file in group})
+                except Exception as e:
+                    print(f"❌ Falha ao baixar {group[0].get('name')}: {e}")
+                
+                if progress_callback:
+                    progress_callback(completed, total, downloaded_bytes)
+        
+        return results
+    
+    def _get_thread_http(self):
+        """
+        Retorna um cliente HTTP autenticado exclusivo da thread (httplib2 não é thread-safe)
+        
+        Todas as chamadas usam este cliente, então uma única instância (e um único
+        serviço de discovery) pode ser compartilhada entre as threads do serviço de fila.
+        """
+        http = getattr(self._thread_local, 'http', None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(self.credentials, http=httplib2.Http())
+            self._thread_local.http = http
+        return http
+    
+    def _download_with_retry(self, file: Dict, store: LocalPhotoStore, max_retries: int):
+        """Baixa um arquivo, retomando o download parcial a cada nova tentativa"""
+        for attempt in range(1, max_retries + 1):
+            try:
+                return self._download_file(file, store)
+            except (HttpError, OSError, ValueError, httplib2.HttpLib2Error) as e:
+                if attempt == max_retries:
+                    raise
+                print(f"⚠️  Tentativa {attempt} falhou para {file.get('name')}: {e} (retomando)")
+                time.sleep(2 ** attempt)
+    
+    def _download_file(self, file: Dict, store: LocalPhotoStore):
+        """Baixa um arquivo em blocos para o armazenamento local"""
+        checksum = file['md5Checksum']
+        mime_type = file.get('mimeType')
+        partial_path = store.partial_path_for(checksum, mime_type)
+        partial_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        offset = partial_path.stat().st_size if partial_path.exists() else 0
+        expected_size = int(file['size']) if file.get('size') else None
+        
+        if expected_size is None or offset < expected_size:
+            request = self.service.files().get_media(fileId=file['id'])
+            request.http = self._get_thread_http()
+            
+            with open(partial_path, 'ab') as fh:
+                downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+                # Retoma do fim do arquivo parcial (o cabeçalho Range parte de _progress)
+                downloader._progress = offset
+                done = False
+                while not done:
+                    _, done = downloader.next_chunk()
+        
+        size = partial_path.stat().st_size
+        return str(store.commit(checksum, mime_type)), size - offset
+    
     def test_connection(self) -> bool:
         """
         Testa a conexão com o Google Drive
@@ -142,7 +444,7 @@ class GoogleDriveClient:
             response = self.service.files().list(
                 pageSize=1,
                 fields='files(id, name)'
-            ).execute()
+            ).execute(http=self._get_thread_http())
             
             print("✅ Conexão com Google Drive testada com sucesso!")
             return True
@@ -0,0 +1,203 @@
+"""
+Histórico de leituras para Extract Fotos
+Responsável por guardar as leituras de cada execução e calcular o consumo por unidade
+"""
+
+import os
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from parser import FileInfo, unit_key
+from duplicate_detector import IssueType, detect_duplicates
+
+# Caminho padrão do banco de histórico (pode ser sobrescrito no .env)
+DEFAULT_HISTORY_PATH = Path(__file__).resolve().parent.parent / "dados" / "historico_leituras.sqlite3"
+
+# Consumo acima deste múltiplo da média histórica é sinalizado como anomalia
+ANOMALY_FACTOR = 3.0
+
+# Formato do período de referência (AAAA-MM)
+PERIOD_RE = re.compile(r'^\d{4}-(0[1-9]|1[0-2])$')
+
+def current_period() -> str:
+    """Período de referência padrão (mês atual, AAAA-MM)"""
+    return datetime.now().strftime("%Y-%m")
+
+def validate_period(periodo: str) -> str:
+    """
+    Valida o período de referência (a ordenação do histórico depende do formato AAAA-MM)
+
+    Raises:
+        ValueError: Se o período não estiver no formato AAAA-MM
+    """
+    if not isinstance(periodo, str) or not PERIOD_RE.match(periodo):
+        raise ValueError(f"Período de referência inválido: '{periodo}' (use AAAA-MM)")
+    return periodo
+
+class ReadingHistoryStore:
+    """Histórico de leituras em SQLite indexado por (condomínio, bloco, apartamento, período)"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Abre (ou cria) o banco de histórico
+
+        Args:
+            db_path: Caminho do arquivo SQLite (opcional)
+        """
+        self.db_path = Path(db_path or os.getenv('HISTORY_DB_PATH', str(DEFAULT_HISTORY_PATH)))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS leituras (
+                condominio TEXT NOT NULL,
+                bloco TEXT NOT NULL,
+                apartamento TEXT NOT NULL,
+                periodo TEXT NOT NULL,
+                leitura INTEGER NOT NULL,
+                filename TEXT NOT NULL,
+                ingested_at TEXT NOT NULL,
+                PRIMARY KEY (condominio, bloco, apartamento, periodo)
+            )
+        """)
+        self._conn.commit()
+
+    def ingest(self, condominio: str, periodo: str, files_info: List[FileInfo]) -> Tuple[int, int]:
+        """
+        Grava as leituras válidas de uma execução (reprocessar o período substitui as leituras dele)
+
+        Unidades com leituras conflitantes (fotos da mesma unidade com leituras diferentes)
+        não são gravadas, para que o histórico não fique com uma leitura arbitrária.
+
+        Args:
+            condominio: Identificador do condomínio (Folder ID)
+            periodo: Período de referência (AAAA-MM)
+            files_info: Lista de FileInfo processados
+
+        Returns:
+            Tupla (leituras gravadas, unidades ignoradas por leituras conflitantes)
+        """
+        validate_period(periodo)
+
+        conflicting = {
+            unit_key(issue.bloco, issue.apartamento)
+            for issue in detect_duplicates(files_info)
+            if issue.issue_type == IssueType.LEITURAS_CONFLITANTES
+        }
+
+        now = datetime.now().isoformat(timespec='seconds')
+        rows = []
+        for f in files_info:
+            if not f.is_valid:
+                continue
+            key = unit_key(f.bloco, f.apartamento)
+            if key not in conflicting:
+                rows.append((condominio, *key, periodo, int(f.leitura), f.filename, now))
+
+        # Reprocessar o período substitui todas as leituras dele: unidades que ficaram
+        # conflitantes ou perderam a foto não mantêm a leitura da execução anterior
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM leituras WHERE condominio = ? AND periodo = ?", (condominio, periodo)
+            )
+            self._conn.executemany(
+                """
+                INSERT OR REPLACE INTO leituras
+                    (condominio, bloco, apartamento, periodo, leitura, filename, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows
+            )
+        return len(rows), len(conflicting)
+
+    def get_previous_readings(self, condominio: str, periodo: str) -> pd.DataFrame:
+        """
+        Obtém, para cada unidade, a última leitura anterior ao período e a média de consumo
+
+        Returns:
+            DataFrame com colunas bloco, apartamento, leitura_anterior, periodo_anterior, consumo_medio
+        """
+        validate_period(periodo)
+        query = """
+            WITH historico AS (
+                SELECT bloco, apartamento, periodo, leitura,
+                       leitura - LAG(leitura) OVER (
+                           PARTITION BY bloco, apartamento ORDER BY periodo
+                       ) AS consumo,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY bloco, apartamento ORDER BY periodo DESC
+                       ) AS ordem
+                FROM leituras
+                WHERE condominio = ? AND periodo < ?
+            )
+            SELECT bloco, apartamento,
+                   MAX(CASE WHEN ordem = 1 THEN leitura END) AS leitura_anterior,
+                   MAX(CASE WHEN ordem = 1 THEN periodo END) AS periodo_anterior,
+                   AVG(consumo) AS consumo_medio
+            FROM historico
+            GROUP BY bloco, apartamento
+        """
+        previous = pd.read_sql_query(query, self._conn, params=(condominio, periodo))
+
+        # Sem histórico as colunas vêm como objeto; garante tipo numérico para o cálculo
+        for column in ['leitura_anterior', 'consumo_medio']:
+            previous[column] = pd.to_numeric(previous[column], errors='coerce')
+        return previous
+
+    def compute_consumption(self, condominio: str, periodo: str, files_info: List[FileInfo]) -> pd.DataFrame:
+        """
+        Calcula consumo e anomalias do período com um join vetorizado contra o histórico
+
+        Args:
+            condominio: Identificador do condomínio (Folder ID)
+            periodo: Período de referência (AAAA-MM)
+            files_info: Lista de FileInfo processados
+
+        Returns:
+            DataFrame com colunas 'Nome do Arquivo', 'Leitura Anterior', 'Consumo' e 'Anomalia'
+        """
+        current = pd.DataFrame(
+            [
+                (f.filename, *unit_key(f.bloco, f.apartamento), int(f.leitura))
+                for f in files_info
+                if f.is_valid
+            ],
+            columns=['Nome do Arquivo', 'bloco', 'apartamento', 'leitura']
+        )
+
+        merged = current.merge(
+            self.get_previous_readings(condominio, periodo),
+            on=['bloco', 'apartamento'],
+            how='left'
+        )
+        merged['Consumo'] = merged['leitura'] - merged['leitura_anterior']
+
+        # Anomalias: leitura menor que a anterior ou consumo muito acima da média da unidade
+        merged['Anomalia'] = ''
+        high = (merged['consumo_medio'] > 0) & (merged['Consumo'] > ANOMALY_FACTOR * merged['consumo_medio'])
+        merged.loc[high, 'Anomalia'] = f"Consumo acima de {ANOMALY_FACTOR:g}x a média"
+        merged.loc[merged['Consumo'] < 0, 'Anomalia'] = "Leitura menor que a anterior"
+
+        result = merged.rename(columns={'leitura_anterior': 'Leitura Anterior'})
+        result = result[['Nome do Arquivo', 'Leitura Anterior', 'Consumo', 'Anomalia']].copy()
+
+        # Unidades sem histórico ficam em branco (o openpyxl não aceita NaN)
+        for column in ['Leitura Anterior', 'Consumo']:
+            result[column] = result[column].map(lambda v: int(v) if pd.notna(v) else '')
+
+        return result.drop_duplicates(subset='Nome do Arquivo')
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,226 @@
+"""
+Fila de processamento para Extract Fotos
+Responsável por guardar os pedidos de processamento de pastas em SQLite
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Caminho padrão da fila (pode ser sobrescrito no .env)
+DEFAULT_QUEUE_PATH = Path(__file__).resolve().parent.parent / "dados" / "fila.sqlite3"
+
+class JobStatus:
+    """Situações de um pedido na fila"""
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDO = "concluido"
+    FALHOU = "falhou"
+
+@dataclass
+class Job:
+    """Pedido de processamento de uma pasta"""
+    job_id: int
+    folder_id: str
+    options: Dict
+    status: str
+    created_at: str
+
+class JobQueue:
+    """Fila em SQLite; pedidos pendentes para a mesma pasta são agrupados em um só"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Abre (ou cria) a fila
+
+        Args:
+            db_path: Caminho do arquivo SQLite (opcional)
+        """
+        self.db_path = Path(db_path or os.getenv('JOB_QUEUE_PATH', str(DEFAULT_QUEUE_PATH)))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Conexão em modo autocommit, compartilhada entre as threads do serviço (protegida por lock)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                folder_id TEXT NOT NULL,
+                options TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                started_at TEXT,
+                finished_at TEXT,
+                error TEXT
+            )
+        """)
+        # No máximo um pedido pendente por pasta
+        self._conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS jobs_pending_folder
+            ON jobs (folder_id) WHERE status = 'pendente'
+        """)
+
+    def enqueue(self, folder_id: str, options: Optional[Dict] = None) -> int:
+        """
+        Adiciona um pedido (ou reaproveita o pedido pendente da mesma pasta)
+
+        Args:
+            folder_id: ID da pasta no Google Drive
+            options: Argumentos nomeados de process_files (devem ser serializáveis em JSON)
+
+        Returns:
+            ID do pedido
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                INSERT INTO jobs (folder_id, options, status, created_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (folder_id) WHERE status = 'pendente' DO NOTHING
+                """,
+                (folder_id, json.dumps(options or {}), JobStatus.PENDENTE, self._now())
+            )
+            if cursor.rowcount:
+                return cursor.lastrowid
+
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE folder_id = ? AND status = ?", (folder_id, JobStatus.PENDENTE)
+            ).fetchone()
+            return row[0]
+
+    def claim_next(self) -> Optional[Job]:
+        """
+        Retira o próximo pedido pendente cuja pasta não está em execução
+
+        Returns:
+            Job marcado como em execução, ou None se não houver pedido disponível
+        """
+        with self._lock:
+            # BEGIN IMMEDIATE: outro processo não retira o mesmo pedido entre o SELECT e o UPDATE
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    """
+                    SELECT id, folder_id, options, status, created_at FROM jobs
+                    WHERE status = ? AND folder_id NOT IN (
+                        SELECT folder_id FROM jobs WHERE status = ?
+                    )
+                    ORDER BY id LIMIT 1
+                    """,
+                    (JobStatus.PENDENTE, JobStatus.EXECUTANDO)
+                ).fetchone()
+
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, started_at = ? WHERE id = ?",
+                        (JobStatus.EXECUTANDO, self._now(), row[0])
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+
+        return Job(row[0], row[1], json.loads(row[2]), JobStatus.EXECUTANDO, row[4])
+
+    def finish(self, job_id: int, success: bool, error: Optional[str] = None):
+        """Marca um pedido como concluído ou com falha"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? WHERE id = ?",
+                (JobStatus.CONCLUIDO if success else JobStatus.FALHOU, self._now(), error, job_id)
+            )
+
+    def requeue(self, job_id: int) -> bool:
+        """
+        Devolve à fila um pedido cancelado durante a execução (ex.: serviço encerrado)
+
+        Returns:
+            True se o pedido voltou a ficar pendente; False se já havia outro pedido
+            pendente para a mesma pasta (o cancelado é marcado como falha)
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, started_at = NULL, error = NULL
+                    WHERE id = ? AND folder_id NOT IN (SELECT folder_id FROM jobs WHERE status = ?)
+                    """,
+                    (JobStatus.PENDENTE, job_id, JobStatus.PENDENTE)
+                )
+                requeued = cursor.rowcount > 0
+                if not requeued:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = ?, finished_at = ?, error = 'Cancelado' WHERE id = ?",
+                        (JobStatus.FALHOU, self._now(), job_id)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            return requeued
+
+    def requeue_interrupted(self) -> int:
+        """
+        Devolve à fila os pedidos que estavam em execução quando o serviço parou
+
+        Returns:
+            Número de pedidos devolvidos (duplicados de pedidos já pendentes são descartados)
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                """
+                UPDATE jobs SET status = ?, error = 'Interrompido'
+                WHERE status = ? AND folder_id IN (SELECT folder_id FROM jobs WHERE status = ?)
+                """,
+                (JobStatus.FALHOU, JobStatus.EXECUTANDO, JobStatus.PENDENTE)
+            )
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL WHERE status = ?",
+                (JobStatus.PENDENTE, JobStatus.EXECUTANDO)
+            )
+            self._conn.execute("COMMIT")
+            return cursor.rowcount
+
+    def pending_count(self) -> int:
+        """Número de pedidos pendentes"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ?", (JobStatus.PENDENTE,)
+            ).fetchone()[0]
+
+    def list_jobs(self, limit: int = 20) -> List[Dict]:
+        """Pedidos mais recentes (para consulta pela linha de comando)"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT id, folder_id, status, created_at, started_at, finished_at, error
+                FROM jobs ORDER BY id DESC LIMIT ?
+                """,
+                (limit,)
+            ).fetchall()
+        columns = ['id', 'folder_id', 'status', 'created_at', 'started_at', 'finished_at', 'error']
+        return [dict(zip(columns, row)) for row in rows]
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat(timespec='seconds')
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
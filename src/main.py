@@ -3,15 +3,30 @@ Arquivo principal do Extract Fotos
 Interface CLI interativa e orquestração de todos os componentes
 """
 
+import io
 import os
+import re
 import sys
+from datetime import date
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 # Importa os módulos locais
 from google_drive import GoogleDriveClient
-from parser import FileNameParser, parse_file_list
-from excel_generator import generate_excel_report
+from parser import FileNameParser, PatternRegistry
+from condominio_config import load_condominio_config
+from parse_cache import ParseCache
+from excel_generator import ShardedReportError, generate_excel_report
+from duplicate_detector import detect_duplicates
+from photo_store import LocalPhotoStore
+from history_store import ReadingHistoryStore, current_period, validate_period
+from unit_registry import UnitRegistry
+from filename_repair import FilenameRepairer
+from progress import CancellationToken, OperationCancelled, ProgressTracker, cancel_on_interrupt
+from run_diff import diff_runs, latest_snapshot, load_run, save_snapshot, summarize_changes, write_diff_report
+
+# Nome padrão do relatório enviado ao Drive (um arquivo por condomínio)
+DEFAULT_UPLOAD_NAME = "extract_fotos_{nome}.xlsx"
 
 def print_banner():
     """Exibe o banner do programa"""
@@ -75,30 +90,166 @@ def get_folder_id() -> str:
         else:
             print("🔄 Digite o Folder ID novamente.")
 
-def process_files(folder_id: str) -> bool:
+def print_download_progress(completed: int, total: int, downloaded_bytes: int):
+    """Exibe o progresso do download das fotos"""
+    if completed == total or completed % 50 == 0:
+        print(f"   📥 {completed}/{total} fotos baixadas ({downloaded_bytes / 1024 / 1024:.1f} MB)")
+
+def print_upload_progress(sent_bytes: int, total_bytes: int):
+    """Exibe o progresso do envio do relatório"""
+    if total_bytes:
+        print(f"   📤 {sent_bytes / 1024 / 1024:.1f} de {total_bytes / 1024 / 1024:.1f} MB enviados")
+
+def get_billing_window() -> Optional[Tuple[date, date]]:
+    """Lê a janela de faturamento do .env (JANELA_FATURAMENTO_INICIO/FIM no formato AAAA-MM-DD)"""
+    start = os.getenv('JANELA_FATURAMENTO_INICIO', '').strip()
+    end = os.getenv('JANELA_FATURAMENTO_FIM', '').strip()
+    
+    if not start or not end:
+        return None
+    
+    try:
+        return date.fromisoformat(start), date.fromisoformat(end)
+    except ValueError:
+        print("❌ Janela de faturamento inválida no .env (use AAAA-MM-DD). Validação desativada.")
+        return None
+
+def get_upload_report_name(template: Optional[str], folder_id: str, nome: Optional[str],
+                           shared_folder: bool) -> str:
+    """
+    Monta o nome do relatório no Drive a partir do modelo NOME_RELATORIO_DRIVE
+    
+    Args:
+        template: Modelo do nome com {nome} e/ou {folder_id} (opcional, usa DEFAULT_UPLOAD_NAME)
+        folder_id: ID da pasta do condomínio
+        nome: Nome do condomínio na configuração (opcional, usa o Folder ID)
+        shared_folder: Se os relatórios de vários condomínios vão para a mesma pasta
+        
+    Returns:
+        Nome do arquivo no Drive
+    """
+    values = {'nome': re.sub(r'[\\/]', '_', nome or folder_id), 'folder_id': folder_id}
+    template = template or DEFAULT_UPLOAD_NAME
+    try:
+        name = template.format(**values)
+    except (KeyError, IndexError, ValueError):
+        print(f"❌ NOME_RELATORIO_DRIVE inválido (use {{nome}} e/ou {{folder_id}}). Nome padrão usado.")
+        name = DEFAULT_UPLOAD_NAME.format(**values)
+    
+    # Sem marcadores, todos os condomínios atualizariam o mesmo arquivo da pasta compartilhada
+    if shared_folder and name == template:
+        stem, extension = os.path.splitext(name)
+        name = f"{stem}_{folder_id}{extension or '.xlsx'}"
+        print(f"⚠️  NOME_RELATORIO_DRIVE sem {{nome}}/{{folder_id}}: relatório enviado como {name}")
+    return name
+
+def get_positive_int(var: str) -> Optional[int]:
+    """Lê do .env um número inteiro positivo (None se ausente ou inválido)"""
+    value = os.getenv(var, '').strip()
+    if not value:
+        return None
+    
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        print(f"❌ {var} inválido no .env (use um número inteiro positivo). Valor padrão mantido.")
+        return None
+    return number
+
+def get_processing_options() -> Dict:
+    """Lê do .env as opções de processamento (argumentos nomeados de process_files)"""
+    def enabled(var: str) -> bool:
+        return os.getenv(var, '').strip().lower() in ['1', 's', 'sim', 'true']
+    
+    max_file_mb = get_positive_int('TAMANHO_MAXIMO_ARQUIVO_MB')
+    return {
+        # Deduplicação por conteúdo (md5Checksum do Drive) é opcional
+        'content_dedup': enabled('DEDUP_CONTEUDO'),
+        'download_photos': enabled('BAIXAR_FOTOS'),
+        'include_media_metadata': enabled('METADADOS_FOTOS'),
+        'billing_window': get_billing_window(),
+        'use_history': enabled('HISTORICO_LEITURAS'),
+        'period': os.getenv('PERIODO_REFERENCIA', '').strip() or None,
+        'split_by_bloco': enabled('RELATORIO_POR_BLOCO'),
+        'compare_runs': enabled('COMPARAR_EXECUCOES'),
+        # Divisão de relatórios grandes em partes (padrão: limite de linhas do Excel)
+        'max_rows_per_file': get_positive_int('LINHAS_POR_ARQUIVO'),
+        'max_bytes_per_file': max_file_mb * 1024 * 1024 if max_file_mb else None,
+        'write_workers': get_positive_int('PROCESSOS_GRAVACAO'),
+        # Cache de parsing é opcional: com os padrões comuns, parsear é mais rápido que consultar o cache
+        'use_parse_cache': enabled('CACHE_PARSING'),
+        'upload_report': enabled('ENVIAR_RELATORIO_DRIVE'),
+        'upload_folder_id': os.getenv('PASTA_RELATORIOS_DRIVE', '').strip() or None,
+        'upload_name': os.getenv('NOME_RELATORIO_DRIVE', '').strip() or None,
+    }
+
+def process_files(folder_id: str, content_dedup: bool = False, download_photos: bool = False,
+                  include_media_metadata: bool = False,
+                  billing_window: Optional[Tuple[date, date]] = None,
+                  use_history: bool = False, period: Optional[str] = None,
+                  split_by_bloco: bool = False, compare_runs: bool = False,
+                  max_rows_per_file: Optional[int] = None, max_bytes_per_file: Optional[int] = None,
+                  write_workers: Optional[int] = None, use_parse_cache: bool = False,
+                  upload_report: bool = False, upload_folder_id: Optional[str] = None,
+                  upload_name: Optional[str] = None,
+                  drive_client: Optional[GoogleDriveClient] = None,
+                  output_dir: Optional[str] = None,
+                  cancel_token: Optional[CancellationToken] = None,
+                  progress: Optional[ProgressTracker] = None) -> bool:
     """
     Processa os arquivos da pasta do Google Drive
     
     Args:
         folder_id: ID da pasta no Google Drive
+        content_dedup: Solicita o md5Checksum na listagem para detectar imagens repetidas
+        download_photos: Baixa as fotos para o armazenamento local (endereçado por md5)
+        include_media_metadata: Solicita data e resolução das fotos na listagem
+        billing_window: Janela de faturamento (início, fim) para validar a data das fotos
+        use_history: Grava as leituras no histórico e adiciona consumo ao relatório
+        period: Período de referência AAAA-MM (opcional, usa o mês atual)
+        split_by_bloco: Cria uma aba por bloco e um resumo por bloco no relatório
+        compare_runs: Salva o retrato da listagem e gera as alterações desde a execução anterior
+        max_rows_per_file: Linhas por arquivo antes de dividir o relatório em partes (opcional)
+        max_bytes_per_file: Tamanho estimado (bytes) por arquivo antes de dividir (opcional)
+        write_workers: Processos usados para gravar as partes do relatório (opcional)
+        use_parse_cache: Reaproveita o parsing de execuções anteriores (só compensa com padrões pesados)
+        upload_report: Envia o relatório direto para o Drive (sem arquivo local)
+        upload_folder_id: Pasta de destino do relatório (opcional, usa a pasta das fotos)
+        upload_name: Modelo do nome do relatório no Drive, com {nome} e {folder_id}
+                     (opcional; o arquivo é atualizado no lugar a cada execução)
+        drive_client: Cliente já autenticado (opcional, reaproveitado pelo serviço de fila)
+        output_dir: Pasta dos arquivos gerados (opcional, usa a pasta atual)
+        cancel_token: Sinal de cancelamento verificado entre páginas, lotes e blocos de linhas (opcional)
+        progress: Acompanhamento de progresso com estimativa de tempo (opcional, imprime no terminal)
         
     Returns:
         True se sucesso, False caso contrário
     """
+    progress = progress or ProgressTracker()
+    
     try:
         print(f"\n🚀 Iniciando processamento...")
         print(f"   📁 Pasta: {folder_id}")
         print(f"   🧠 Tipo: Detectado automaticamente pelo sistema")
         print()
         
-        # 1. Conecta ao Google Drive
-        print("🔐 Conectando ao Google Drive...")
-        drive_client = GoogleDriveClient()
-        print("✅ Conectado com sucesso!")
+        # 1. Conecta ao Google Drive (ou reaproveita a conexão existente)
+        if drive_client is None:
+            print("🔐 Conectando ao Google Drive...")
+            drive_client = GoogleDriveClient()
+            print("✅ Conectado com sucesso!")
         
         # 2. Lista arquivos da pasta
         print("📋 Listando arquivos da pasta...")
-        files = drive_client.list_files_in_folder(folder_id)
+        files = drive_client.list_files_in_folder(
+            folder_id,
+            include_checksum=content_dedup or download_photos,
+            include_media_metadata=include_media_metadata or billing_window is not None,
+            progress=progress,
+            cancel_token=cancel_token
+        )
         
         if not files:
             print("❌ Nenhum arquivo de imagem encontrado na pasta!")
@@ -106,16 +257,26 @@ def process_files(folder_id: str) -> bool:
         
         print(f"✅ Encontrados {len(files)} arquivos de imagem")
         
-        # 3. Extrai nomes dos arquivos
-        print("📝 Extraindo nomes dos arquivos...")
-        filenames = [file['name'] for file in files]
-        
-        # 4. Processa nomes dos arquivos
+        # 3. Processa nomes dos arquivos
         print("🔍 Processando nomes dos arquivos...")
-        parser = FileNameParser()
-        files_info, stats = parse_file_list(filenames)
+        condominio_config = load_condominio_config(folder_id)
+        registry = PatternRegistry.from_config(condominio_config)
+        print(f"   🧩 Padrões configurados: {', '.join(spec.name for spec in registry.patterns)}")
+        if use_parse_cache:
+            with ParseCache(registry.config_hash) as parse_cache:
+                parser = FileNameParser(registry, parse_cache)
+                files_info = parser.parse_drive_files(files, progress, cancel_token)
+                cache_stats = parse_cache.get_statistics()
+            print(f"   ♻️  Cache de parsing: {cache_stats['hits']} reaproveitados, "
+                  f"{cache_stats['misses']} novos ({cache_stats['hit_rate']:.1f}% de acerto)")
+        else:
+            parser = FileNameParser(registry)
+            files_info = parser.parse_drive_files(files, progress, cancel_token)
+        if billing_window:
+            parser.validate_capture_window(files_info, *billing_window)
+        stats = parser.get_statistics(files_info)
         
-        # 5. Exibe estatísticas
+        # 4. Exibe estatísticas
         print("\n📊 Estatísticas do processamento:")
         print(f"   📁 Total de arquivos: {stats['total_files']}")
         print(f"   ✅ Arquivos válidos: {stats['valid_files']}")
@@ -124,19 +285,112 @@ def process_files(folder_id: str) -> bool:
         print(f"   🏠 SEM blocos: {stats['without_blocks']}")
         print(f"   📈 Taxa de sucesso: {stats['success_rate']:.1f}%")
         
-        # 6. Verifica se há arquivos válidos
+        if billing_window:
+            print(f"   🗓️  Fotos fora da janela de faturamento: {stats['outside_window']}")
+        
+        unit_registry = UnitRegistry.from_config(condominio_config)
+        if unit_registry:
+            missing, unexpected = unit_registry.diff(files_info)
+            print(f"   🏘️  Unidades sem foto: {len(missing)} de {len(unit_registry)} "
+                  f"| Fotos fora do cadastro: {len(unexpected)}")
+        
+        repair_suggestions = {}
+        if stats['invalid_files']:
+            repair_suggestions = FilenameRepairer(FileNameParser(registry), unit_registry).suggest_all(files_info)
+            print(f"   🛠️  Sugestões de correção: {len(repair_suggestions)} de {stats['invalid_files']} "
+                  f"arquivos inválidos (veja a aba 'Estatísticas')")
+        
+        duplicate_issues = detect_duplicates(files_info)
+        if duplicate_issues:
+            print(f"   ⚠️  Problemas de duplicidade: {len(duplicate_issues)} (veja a aba 'Duplicados')")
+        
+        # 5. Verifica se há arquivos válidos
         if stats['valid_files'] == 0:
             print("\n❌ Nenhum arquivo válido encontrado!")
             print("   Verifique se os nomes seguem o padrão esperado.")
             return False
         
+        # 6. Atualiza o histórico e calcula o consumo (opcional)
+        consumption = None
+        if use_history:
+            period = period or current_period()
+            try:
+                validate_period(period)
+            except ValueError as e:
+                print(f"\n❌ {e}. Histórico não atualizado.")
+                use_history = False
+        if use_history:
+            print(f"\n🗄️  Atualizando histórico de leituras (período {period})...")
+            with ReadingHistoryStore() as history:
+                ingested, conflicting = history.ingest(folder_id, period, files_info)
+                consumption = history.compute_consumption(folder_id, period, files_info)
+            anomalies = int((consumption['Anomalia'] != '').sum())
+            print(f"✅ {ingested} leituras gravadas, {anomalies} anomalias de consumo")
+            if conflicting:
+                print(f"⚠️  {conflicting} unidades com leituras conflitantes não foram gravadas no histórico")
+        
         # 7. Gera relatório Excel
         print("\n📊 Gerando relatório Excel...")
         timestamp = f"auto_detectado_{len(files_info)}_arquivos"
-        output_file = generate_excel_report(files_info, f"extract_fotos_{timestamp}.xlsx")
+        output_prefix = "extract_fotos"
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+            output_prefix = os.path.join(output_dir, output_prefix)
+        if upload_report:
+            # Gera em memória e envia em upload retomável, atualizando o relatório anterior
+            buffer = io.BytesIO()
+            report_name = get_upload_report_name(
+                upload_name, folder_id, condominio_config.get('nome'), bool(upload_folder_id)
+            )
+            try:
+                generate_excel_report(
+                    files_info, report_name, consumption, unit_registry, repair_suggestions,
+                    split_by_bloco, output_stream=buffer, progress=progress, cancel_token=cancel_token,
+                    max_rows_per_file=max_rows_per_file, max_bytes_per_file=max_bytes_per_file,
+                    max_workers=write_workers
+                )
+            except ShardedReportError as e:
+                # As partes ficam ao lado do índice: o relatório dividido só é gravado localmente
+                print(f"⚠️  {e}: relatório salvo localmente, sem envio ao Drive")
+                upload_report = False
+        if upload_report:
+            print("📤 Enviando relatório para o Google Drive...")
+            report_id = drive_client.upload_report(
+                buffer, report_name, upload_folder_id or folder_id, progress_callback=print_upload_progress,
+                cancel_token=cancel_token
+            )
+            output_file = f"{report_name} (Google Drive, ID {report_id})"
+        else:
+            output_file = generate_excel_report(
+                files_info, f"{output_prefix}_{timestamp}.xlsx", consumption, unit_registry, repair_suggestions,
+                split_by_bloco, progress=progress, cancel_token=cancel_token,
+                max_rows_per_file=max_rows_per_file, max_bytes_per_file=max_bytes_per_file,
+                max_workers=write_workers
+            )
         
         print(f"✅ Relatório gerado com sucesso: {output_file}")
         
+        # Compara com a execução anterior (opcional)
+        if compare_runs:
+            previous_snapshot = latest_snapshot(folder_id)
+            snapshot_path = save_snapshot(folder_id, files_info)
+            if previous_snapshot:
+                print(f"\n🔁 Comparando com a execução anterior ({previous_snapshot.name})...")
+                changes = diff_runs(load_run(previous_snapshot), load_run(snapshot_path))
+                for change_type, count in summarize_changes(changes).items():
+                    print(f"   • {change_type.value}: {count}")
+                diff_file = write_diff_report(changes, f"{output_prefix}_{timestamp}_alteracoes.xlsx")
+                print(f"✅ Alterações salvas em: {diff_file}")
+            else:
+                print(f"📸 Primeiro retrato salvo para comparação futura: {snapshot_path}")
+        
+        # Baixa as fotos para auditoria (opcional)
+        if download_photos:
+            print("\n📥 Baixando fotos para o armazenamento local...")
+            store = LocalPhotoStore()
+            local_paths = drive_client.download_files(files, store, progress_callback=print_download_progress)
+            print(f"✅ {len(local_paths)} fotos disponíveis em: {store.root}")
+        
         # 8. Exibe resumo final
         print("\n🎉 Processamento concluído com sucesso!")
         print(f"   📊 Arquivos processados: {stats['valid_files']}")
@@ -144,6 +398,10 @@ def process_files(folder_id: str) -> bool:
         
         return True
         
+    except OperationCancelled:
+        print("\n⏹️  Processamento cancelado. Nenhum relatório parcial foi gravado;")
+        print("   a próxima execução reaproveita as fotos já baixadas.")
+        return False
     except Exception as e:
         print(f"\n❌ Erro durante o processamento: {e}")
         print("   Verifique suas credenciais e tente novamente.")
@@ -165,6 +423,9 @@ def main():
             print("   Configure o arquivo .env com o conteúdo JSON da sua Service Account")
             return
         
+        # Opções de processamento configuradas no .env
+        options = get_processing_options()
+        
         # Exibe banner
         print_banner()
         
@@ -183,7 +444,9 @@ def main():
             folder_id = get_folder_id()
             
             # Processa arquivos (tipo detectado automaticamente)
-            success = process_files(folder_id)
+            # Primeiro Ctrl+C cancela no próximo ponto seguro (sem relatório pela metade)
+            with cancel_on_interrupt(CancellationToken()) as cancel_token:
+                success = process_files(folder_id, cancel_token=cancel_token, **options)
             
             if success:
                 # Pergunta se quer processar outra pasta
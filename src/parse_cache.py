@@ -0,0 +1,198 @@
+"""
+Cache de parsing para Extract Fotos
+Responsável por memorizar o resultado do parser entre execuções (SQLite, consultado pelos nomes da listagem)
+"""
+
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from parser import FileInfo, CondominioType
+
+# Caminho padrão do cache (pode ser sobrescrito no .env)
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "parse_cache.sqlite3"
+
+# Intervalo mínimo para atualizar o last_used de uma entrada reaproveitada (segundos)
+TOUCH_INTERVAL = 7 * 24 * 3600
+
+# Entradas sem uso há mais tempo que isso são removidas do disco (segundos)
+MAX_ENTRY_AGE = 90 * 24 * 3600
+
+# Nomes consultados por comando SQL na pré-carga (abaixo do limite de parâmetros do SQLite)
+PREFETCH_BATCH_SIZE = 500
+
+# Registro em memória: (tipo, bloco, apartamento, leitura, is_valid, error_message)
+CacheEntry = Tuple[CondominioType, Optional[str], Optional[str], Optional[str], bool, Optional[str]]
+
+class ParseCache:
+    """Cache do parser persistido em SQLite e versionado pela configuração do parser"""
+
+    def __init__(self, config_version: str, db_path: Optional[str] = None, max_age: float = MAX_ENTRY_AGE):
+        """
+        Abre (ou cria) o cache para uma versão de configuração
+
+        Cada versão de configuração (um condomínio com padrões próprios, por exemplo)
+        tem suas próprias entradas. Nada é carregado na abertura: prefetch() busca apenas
+        os nomes da listagem atual, e entradas sem uso há mais de max_age são removidas.
+
+        Args:
+            config_version: Hash da configuração de padrões (PatternRegistry.config_hash)
+            db_path: Caminho do arquivo SQLite (opcional)
+            max_age: Tempo máximo sem uso de uma entrada em disco (segundos)
+        """
+        self.config_version = config_version
+        self.max_age = max_age
+        self.db_path = Path(db_path or os.getenv('PARSE_CACHE_PATH', str(DEFAULT_CACHE_PATH)))
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: Dict[str, CacheEntry] = {}
+        self._dirty: Dict[str, CacheEntry] = {}
+        self._last_used: Dict[str, float] = {}
+        self._now = time.time()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # Execuções simultâneas (serviço de fila) compartilham o mesmo arquivo
+        self._conn = sqlite3.connect(str(self.db_path), timeout=30)
+        self._init_db()
+
+    def _init_db(self):
+        """Cria a tabela do cache (entradas de todas as versões de configuração)"""
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS parse_cache (
+                config_version TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                condominio_type TEXT NOT NULL,
+                bloco TEXT,
+                apartamento TEXT,
+                leitura TEXT,
+                is_valid INTEGER NOT NULL,
+                error_message TEXT,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (config_version, filename)
+            )
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS parse_cache_last_used ON parse_cache (last_used)"
+        )
+        self._conn.commit()
+
+    def _trim(self):
+        """Remove do disco as entradas sem uso há mais de max_age (de qualquer versão)"""
+        self._conn.execute(
+            "DELETE FROM parse_cache WHERE last_used < ?", (time.time() - self.max_age,)
+        )
+
+    def prefetch(self, filenames: Iterable[str]):
+        """
+        Carrega para a memória as entradas dos nomes informados (consultas em lotes pela chave)
+
+        Args:
+            filenames: Nomes de arquivo da listagem atual
+        """
+        pending = [f for f in dict.fromkeys(filenames) if f not in self._entries]
+        types = {t.value: t for t in CondominioType}
+
+        for start in range(0, len(pending), PREFETCH_BATCH_SIZE):
+            batch = pending[start:start + PREFETCH_BATCH_SIZE]
+            rows = self._conn.execute(
+                f"""
+                SELECT filename, condominio_type, bloco, apartamento, leitura, is_valid, error_message, last_used
+                FROM parse_cache
+                WHERE config_version = ? AND filename IN ({', '.join('?' * len(batch))})
+                """,
+                (self.config_version, *batch)
+            ).fetchall()
+
+            for filename, condominio_type, bloco, apartamento, leitura, is_valid, error_message, last_used in rows:
+                self._entries[filename] = (
+                    types[condominio_type], bloco, apartamento, leitura, bool(is_valid), error_message
+                )
+                self._last_used[filename] = last_used
+
+    def get(self, filename: str) -> Optional[FileInfo]:
+        """
+        Busca o resultado memorizado de um nome de arquivo (carregado por prefetch ou put)
+
+        Returns:
+            Nova instância de FileInfo ou None se não estiver no cache
+        """
+        entry = self._entries.get(filename)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        # Só regrava entradas antigas, para que execuções repetidas quase não escrevam em disco
+        if self._now - self._last_used.get(filename, self._now) > TOUCH_INTERVAL:
+            self._dirty[filename] = entry
+
+        return FileInfo(filename, *entry)
+
+    def put(self, file_info: FileInfo):
+        """Memoriza o resultado do parser para um nome de arquivo"""
+        entry = (
+            file_info.condominio_type,
+            file_info.bloco,
+            file_info.apartamento,
+            file_info.leitura,
+            file_info.is_valid,
+            file_info.error_message
+        )
+        self._entries[file_info.filename] = entry
+        self._dirty[file_info.filename] = entry
+
+    def flush(self):
+        """Grava no SQLite as entradas novas ou usadas nesta execução"""
+        if not self._dirty:
+            return
+
+        now = time.time()
+        for filename in self._dirty:
+            self._last_used[filename] = now
+
+        self._conn.executemany(
+            """
+            INSERT OR REPLACE INTO parse_cache
+                (config_version, filename, condominio_type, bloco, apartamento, leitura,
+                 is_valid, error_message, last_used)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (self.config_version, filename, entry[0].value, *entry[1:4], int(entry[4]), entry[5], now)
+                for filename, entry in self._dirty.items()
+            ]
+        )
+        self._trim()
+        self._conn.commit()
+        self._dirty.clear()
+
+    def close(self):
+        """Grava as pendências e fecha a conexão"""
+        self.flush()
+        self._conn.close()
+
+    def get_statistics(self) -> Dict:
+        """
+        Gera estatísticas de uso do cache
+
+        Returns:
+            Dicionário com acertos, falhas, taxa de acerto e tamanho
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'hit_rate': (self.hits / lookups * 100) if lookups > 0 else 0
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -4,10 +4,15 @@ Responsável por extrair informações dos nomes dos arquivos de imagem
 """
 
 import re
+import json
+import hashlib
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
+from datetime import date, datetime
 from enum import Enum
 
+from progress import CancellationToken, ProgressTracker, track
+
 class CondominioType(Enum):
     """Tipos de condomínio suportados"""
     COM_BLOCOS = "com_blocos"
@@ -23,21 +28,322 @@ class FileInfo:
     leitura: Optional[str] = None
     is_valid: bool = False
     error_message: Optional[str] = None
+    file_id: Optional[str] = None
+    md5_checksum: Optional[str] = None
+    created_time: Optional[datetime] = None
+    photo_time: Optional[datetime] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    capture_in_window: Optional[bool] = None
+    
+    @property
+    def capture_time(self) -> Optional[datetime]:
+        """Momento da foto (EXIF do Drive) ou, na falta dele, a data de upload"""
+        return self.photo_time or self.created_time
+
+def parse_drive_datetime(value: Optional[str]) -> Optional[datetime]:
+    """
+    Converte datas retornadas pelo Google Drive
+
+    Aceita o formato RFC 3339 de createdTime (2024-01-31T12:00:00.000Z) e o formato
+    EXIF de imageMediaMetadata.time (2024:01:31 12:00:00). createdTime é convertido
+    para o horário local, já que o EXIF não informa fuso.
+
+    Returns:
+        datetime sem fuso horário ou None se vazio/inválido
+    """
+    if not value:
+        return None
+
+    try:
+        if 'T' in value:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return parsed.astimezone().replace(tzinfo=None)
+        return datetime.strptime(value, '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+
+def unit_key(bloco: Optional[str], apartamento: Optional[str]) -> Tuple[str, str]:
+    """
+    Chave normalizada de uma unidade (bloco sem diferenciar maiúsculas/minúsculas)
+
+    Args:
+        bloco: Bloco da unidade (None para condomínios sem blocos)
+        apartamento: Número do apartamento
+
+    Returns:
+        Tupla (bloco, apartamento) usada para indexar unidades
+    """
+    return ((bloco or '').upper(), apartamento or '')
+
+def unit_sort_key(bloco: Optional[str], apartamento: Optional[str]) -> Tuple[int, int, str, int]:
+    """
+    Chave de ordenação natural de uma unidade
+
+    Blocos numéricos vêm antes dos alfabéticos e são comparados como inteiros;
+    apartamentos também (evita "1001" antes de "201").
+
+    Returns:
+        Tupla (bloco não numérico, bloco numérico, bloco textual, apartamento)
+    """
+    bloco = (bloco or '').upper()
+    if bloco.isdigit():
+        bloco_key = (0, int(bloco), '')
+    else:
+        bloco_key = (1, 0, bloco)
+
+    apartamento_key = int(apartamento) if apartamento and apartamento.isdigit() else -1
+    return (*bloco_key, apartamento_key)
+
+@dataclass(frozen=True)
+class PatternSpec:
+    """Padrão de nome de arquivo configurável (grupos nomeados: bloco, apartamento, leitura)"""
+    name: str
+    regex: str
+    condominio_type: CondominioType
+
+# Padrões padrão: COM blocos (bloco-apartamento-leitura) e SEM blocos (apartamento-leitura)
+DEFAULT_PATTERNS = [
+    PatternSpec(
+        name="com_blocos",
+        regex=r'(?P<bloco>[A-Za-z0-9]+)-(?P<apartamento>\d+)-(?P<leitura>\d+)',
+        condominio_type=CondominioType.COM_BLOCOS
+    ),
+    PatternSpec(
+        name="sem_blocos",
+        regex=r'(?P<apartamento>\d+)-(?P<leitura>\d+)',
+        condominio_type=CondominioType.SEM_BLOCOS
+    ),
+]
+
+# Validadores dos campos extraídos (compilados uma única vez)
+FIELD_VALIDATORS = {
+    'bloco': re.compile(r'[A-Za-z0-9]+'),
+    'apartamento': re.compile(r'\d+'),
+    'leitura': re.compile(r'\d+'),
+}
+
+# Grupos nomeados aceitos nos padrões configurados
+PATTERN_FIELDS = ('bloco', 'apartamento', 'leitura')
+
+# Cache de matchers compilados por hash da configuração
+_MATCHER_CACHE: Dict[str, 'CompiledMatcher'] = {}
+
+# Arquivos processados entre duas verificações de cancelamento/progresso
+PARSE_BATCH_SIZE = 5_000
+
+class CompiledMatcher:
+    """Matcher único que combina todos os padrões em uma alternância"""
+
+    # Renomeia grupos nomeados e referências para nomes únicos por padrão
+    _GROUP_NAME_RE = re.compile(r'\(\?P([<=])(\w+)')
+
+    # Flags globais no início do padrão, ex.: (?i)
+    _GLOBAL_FLAGS_RE = re.compile(r'^\(\?([aiLmsux]+)\)')
+
+    # Âncoras: o matcher combinado já ancora o nome e aceita as extensões depois dele
+    _START_ANCHOR_RE = re.compile(r'^(?:\^|\\A)')
+    _END_ANCHOR_RE = re.compile(r'(?<!\\)(?:\\\\)*(?:\$|\\Z)$')
+
+    # Grupos de campo cujo conteúdo já garante o formato de FIELD_VALIDATORS
+    _SAFE_FIELD_RE = re.compile(
+        r'\(\?P<(?:(bloco)>(?:\[A-Za-z0-9\]|\[A-Z0-9\]|\[a-zA-Z0-9\]|\[A-Z\]|\[A-Za-z\]|\\d|\[0-9\])'
+        r'|(apartamento|leitura)>(?:\\d|\[0-9\]))\+?\)(?![?*{])'
+    )
+    # Parênteses ou alternância não escapados (grupos opcionais ou fora do nível principal)
+    _STRUCTURE_RE = re.compile(r'(?<!\\)(?:\\\\)*[()|]')
+
+    def __init__(self, patterns: List[PatternSpec]):
+        """Compila os padrões em uma única expressão regular"""
+        self.patterns = list(patterns)
+        self._groups: Dict[str, Tuple[PatternSpec, Tuple[str, ...], bool, bool]] = {}
+
+        alternatives = []
+        for index, spec in enumerate(self.patterns):
+            prefix = f"p{index}_"
+            field_names = [
+                field for field in PATTERN_FIELDS
+                if field in re.compile(spec.regex).groupindex
+            ]
+            flags, body = self._split_pattern(spec.regex)
+            renamed = self._GROUP_NAME_RE.sub(
+                lambda m: f"(?P{m.group(1)}{prefix}{m.group(2)}", body
+            )
+            # Flags globais só valem no início da expressão: viram flags do próprio grupo
+            if flags:
+                # No modo verboso (x) um comentário no fim não pode engolir o parêntese
+                closing = '\n)' if 'x' in flags else ')'
+                renamed = f"(?{flags}:{renamed}{closing}"
+            # O grupo externo fecha por último, então identifica o padrão via lastgroup
+            alternative = f"(?P<p{index}>{renamed})"
+            try:
+                re.compile(alternative)
+            except re.error as e:
+                raise ValueError(f"Padrão '{spec.name}' não pode ser combinado com os demais: {e}")
+            alternatives.append(alternative)
+            self._groups[f"p{index}"] = (
+                spec,
+                tuple(prefix + field for field in field_names),
+                'bloco' in field_names,
+                self._needs_validation(spec, body),
+            )
+
+        # A ordem da alternância preserva a prioridade dos padrões.
+        # Aceita até duas extensões, como o re.sub + padrão faziam antes.
+        try:
+            self.regex = re.compile(
+                r'^(?:' + '|'.join(alternatives) + r')(?:\.\w+){0,2}$'
+            )
+        except re.error as e:
+            names = ', '.join(spec.name for spec in self.patterns)
+            raise ValueError(f"Não foi possível combinar os padrões ({names}): {e}")
+
+    @classmethod
+    def _split_pattern(cls, regex: str) -> Tuple[str, str]:
+        """Separa as flags globais e remove as âncoras de início e fim do padrão"""
+        flags = ''
+        match = cls._GLOBAL_FLAGS_RE.match(regex)
+        if match:
+            flags, regex = match.group(1), regex[match.end():]
+        regex = cls._START_ANCHOR_RE.sub('', regex, count=1)
+        end = cls._END_ANCHOR_RE.search(regex)
+        if end:
+            # Mantém as barras invertidas escapadas que antecedem a âncora
+            anchor_length = 1 if regex.endswith('$') else 2
+            regex = regex[:len(regex) - anchor_length]
+        return flags, regex
+
+    @classmethod
+    def _needs_validation(cls, spec: PatternSpec, body: str) -> bool:
+        """
+        Indica se os campos extraídos pelo padrão precisam passar por FIELD_VALIDATORS
+
+        Calculado uma vez por padrão: grupos como (?P<apartamento>\\d+) no nível principal,
+        sem alternância nem grupos opcionais, já garantem o formato.
+        """
+        required = {'apartamento', 'leitura'}
+        if spec.condominio_type == CondominioType.COM_BLOCOS:
+            required.add('bloco')
+
+        safe = {m.group(1) or m.group(2) for m in cls._SAFE_FIELD_RE.finditer(body)}
+        rest = cls._SAFE_FIELD_RE.sub('', body)
+        return not required <= safe or bool(cls._STRUCTURE_RE.search(rest))
+
+    def match(self, filename: str) -> Optional[Tuple[PatternSpec, Tuple[Optional[str], str, str], bool]]:
+        """
+        Aplica o matcher combinado a um nome de arquivo
+
+        Returns:
+            Tupla (padrão encontrado, (bloco, apartamento, leitura), precisa validar os campos) ou None
+        """
+        match = self.regex.match(filename)
+        if not match:
+            return None
+
+        spec, groups, has_bloco, needs_validation = self._groups[match.lastgroup]
+        values = match.group(*groups)
+        if not has_bloco:
+            values = (None, *values)
+        return spec, values, needs_validation
+
+class PatternRegistry:
+    """Registro de padrões de nomes de arquivo configurável por condomínio"""
+
+    # Referências numeradas (\1 ou (?(1)...)), fora de barras invertidas escapadas
+    _NUMBERED_REFERENCE_RE = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\(\d+\))')
+
+    def __init__(self, patterns: Optional[List[PatternSpec]] = None):
+        """
+        Inicializa o registro
+
+        Args:
+            patterns: Lista de padrões em ordem de prioridade (usa os padrões padrão se vazio)
+        """
+        self.patterns = list(patterns) if patterns else list(DEFAULT_PATTERNS)
+        for spec in self.patterns:
+            self._check_pattern(spec)
+
+        self.config_hash = self._compute_hash()
+
+    @classmethod
+    def from_config(cls, config: Dict) -> 'PatternRegistry':
+        """
+        Cria o registro a partir da configuração de um condomínio
+
+        Formato esperado:
+            {"padroes": [{"nome": "...", "tipo": "com_blocos", "regex": "..."}]}
+        """
+        patterns = []
+        for item in config.get('padroes', []):
+            try:
+                patterns.append(PatternSpec(
+                    name=item.get('nome', f"padrao_{len(patterns) + 1}"),
+                    regex=item['regex'],
+                    condominio_type=CondominioType(item.get('tipo', CondominioType.COM_BLOCOS.value))
+                ))
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Padrão inválido na configuração: {item} ({e})")
+
+        return cls(patterns)
+
+    def get_matcher(self) -> CompiledMatcher:
+        """Retorna o matcher compilado (reaproveitado entre registros com a mesma configuração)"""
+        matcher = _MATCHER_CACHE.get(self.config_hash)
+        if matcher is None:
+            matcher = CompiledMatcher(self.patterns)
+            _MATCHER_CACHE[self.config_hash] = matcher
+        return matcher
+
+    def _compute_hash(self) -> str:
+        """Gera hash estável da configuração de padrões"""
+        payload = json.dumps(
+            [[spec.name, spec.regex, spec.condominio_type.value] for spec in self.patterns],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _check_pattern(spec: PatternSpec):
+        """Valida um padrão individualmente para gerar mensagens de erro claras"""
+        try:
+            groups = re.compile(spec.regex).groupindex
+        except re.error as e:
+            raise ValueError(f"Regex inválida no padrão '{spec.name}': {e}")
+
+        required = {'apartamento', 'leitura'}
+        if spec.condominio_type == CondominioType.COM_BLOCOS:
+            required.add('bloco')
+
+        missing = required - set(groups)
+        if missing:
+            raise ValueError(
+                f"Padrão '{spec.name}' precisa dos grupos nomeados: {', '.join(sorted(missing))}"
+            )
+
+        # Na alternância combinada os grupos são renumerados: referências por número
+        # (\1, (?(1)...)) apontariam para o grupo de outro padrão
+        if PatternRegistry._NUMBERED_REFERENCE_RE.search(spec.regex):
+            raise ValueError(
+                f"Padrão '{spec.name}' usa referência numerada a grupo; use (?P=nome) com grupos nomeados"
+            )
 
 class FileNameParser:
     """Parser para nomes de arquivos de imagem"""
     
-    def __init__(self):
-        """Inicializa o parser com padrões regex"""
-        # Padrão para condomínio COM blocos: bloco-apartamento-leitura
-        self.pattern_with_blocks = re.compile(
-            r'^([A-Za-z0-9]+)-(\d+)-(\d+)(?:\.\w+)?$'
-        )
+    def __init__(self, registry: Optional[PatternRegistry] = None, cache=None):
+        """
+        Inicializa o parser com o registro de padrões
+
+        Args:
+            registry: Registro de padrões do condomínio (opcional, usa os padrões padrão)
+            cache: ParseCache da mesma versão de configuração (opcional)
+        """
+        self.registry = registry or PatternRegistry()
+        self.matcher = self.registry.get_matcher()
         
-        # Padrão para condomínio SEM blocos: apartamento-leitura
-        self.pattern_without_blocks = re.compile(
-            r'^(\d+)-(\d+)(?:\.\w+)?$'
-        )
+        if cache is not None and cache.config_version != self.registry.config_hash:
+            raise ValueError("O cache de parsing pertence a outra configuração de padrões")
+        self.cache = cache
     
     def parse_filename(self, filename: str) -> FileInfo:
         """
@@ -49,41 +355,82 @@ class FileNameParser:
         Returns:
             FileInfo com as informações extraídas
         """
-        # Remove extensão do arquivo para análise
-        name_without_ext = re.sub(r'\.\w+$', '', filename)
+        if self.cache is None:
+            return self._parse_uncached(filename)
         
-        # Tenta primeiro o padrão COM blocos
-        match = self.pattern_with_blocks.match(name_without_ext)
-        if match:
-            bloco, apartamento, leitura = match.groups()
-            return FileInfo(
-                filename=filename,
-                condominio_type=CondominioType.COM_BLOCOS,
-                bloco=bloco,
-                apartamento=apartamento,
-                leitura=leitura,
-                is_valid=True
-            )
+        file_info = self.cache.get(filename)
+        if file_info is None:
+            file_info = self._parse_uncached(filename)
+            self.cache.put(file_info)
         
-        # Tenta o padrão SEM blocos
-        match = self.pattern_without_blocks.match(name_without_ext)
-        if match:
-            apartamento, leitura = match.groups()
+        return file_info
+    
+    def _parse_uncached(self, filename: str) -> FileInfo:
+        """Aplica o matcher combinado e valida os campos extraídos"""
+        # Todos os padrões são testados em uma única passada do matcher combinado
+        result = self.matcher.match(filename)
+        
+        # Se não encontrou padrão válido
+        if result is None:
             return FileInfo(
                 filename=filename,
-                condominio_type=CondominioType.SEM_BLOCOS,
-                apartamento=apartamento,
-                leitura=leitura,
-                is_valid=True
+                condominio_type=CondominioType.COM_BLOCOS,  # Default
+                is_valid=False,
+                error_message="Nome do arquivo não segue os padrões esperados"
             )
         
-        # Se não encontrou padrão válido
-        return FileInfo(
+        spec, (bloco, apartamento, leitura), needs_validation = result
+        file_info = FileInfo(
             filename=filename,
-            condominio_type=CondominioType.COM_BLOCOS,  # Default
-            is_valid=False,
-            error_message="Nome do arquivo não segue os padrões esperados"
+            condominio_type=spec.condominio_type,
+            bloco=bloco if spec.condominio_type == CondominioType.COM_BLOCOS else None,
+            apartamento=apartamento,
+            leitura=leitura,
+            is_valid=True
         )
+        
+        # Valida os campos na mesma passada (padrões configurados podem ser mais permissivos)
+        if needs_validation and not self._fields_are_valid(file_info):
+            file_info.is_valid = False
+            file_info.error_message = f"Campos fora do formato esperado (padrão '{spec.name}')"
+        
+        return file_info
+    
+    def parse_drive_files(self, files: List[Dict], progress: Optional[ProgressTracker] = None,
+                          cancel_token: Optional[CancellationToken] = None) -> List[FileInfo]:
+        """
+        Processa a listagem do Google Drive preservando os metadados de cada arquivo
+        
+        Args:
+            files: Arquivos retornados por GoogleDriveClient.list_files_in_folder
+            progress: Acompanhamento de progresso, avançado a cada lote (opcional)
+            cancel_token: Sinal de cancelamento, verificado entre os lotes (opcional)
+            
+        Returns:
+            Lista de FileInfo processados (com id, md5Checksum e metadados quando disponíveis)
+        """
+        if progress:
+            progress.start("Processamento dos nomes", len(files))
+        if self.cache is not None:
+            self.cache.prefetch(file['name'] for file in files)
+        
+        results = []
+        for file in track(files, progress, cancel_token, PARSE_BATCH_SIZE):
+            file_info = self.parse_filename(file['name'])
+            file_info.file_id = file.get('id')
+            file_info.md5_checksum = file.get('md5Checksum')
+            
+            # Metadados da foto, quando solicitados na listagem
+            media = file.get('imageMediaMetadata', {})
+            file_info.created_time = parse_drive_datetime(file.get('createdTime'))
+            file_info.photo_time = parse_drive_datetime(media.get('time'))
+            file_info.width = media.get('width')
+            file_info.height = media.get('height')
+            results.append(file_info)
+        
+        if progress:
+            progress.finish()
+        return results
     
     def parse_multiple_files(self, filenames: List[str]) -> List[FileInfo]:
         """
@@ -95,6 +442,9 @@ class FileNameParser:
         Returns:
             Lista de FileInfo processados
         """
+        if self.cache is not None:
+            self.cache.prefetch(filenames)
+        
         results = []
         for filename in filenames:
             file_info = self.parse_filename(filename)
@@ -123,6 +473,9 @@ class FileNameParser:
         # Arquivos com erro
         error_files = [f for f in files_info if not f.is_valid]
         
+        # Fotos fora da janela de faturamento (quando validada)
+        outside_window = sum(1 for f in files_info if f.capture_in_window is False)
+        
         return {
             'total_files': total_files,
             'valid_files': valid_files,
@@ -130,9 +483,34 @@ class FileNameParser:
             'with_blocks': with_blocks,
             'without_blocks': without_blocks,
             'error_files': error_files,
+            'outside_window': outside_window,
             'success_rate': (valid_files / total_files * 100) if total_files > 0 else 0
         }
     
+    def validate_capture_window(self, files_info: List[FileInfo], start: date, end: date) -> List[FileInfo]:
+        """
+        Marca as fotos tiradas fora da janela de faturamento
+        
+        Args:
+            files_info: Lista de FileInfo com metadados do Drive
+            start: Primeiro dia da janela (inclusive)
+            end: Último dia da janela (inclusive)
+            
+        Returns:
+            Lista de FileInfo fora da janela (fotos sem data não são marcadas)
+        """
+        outside = []
+        for file_info in files_info:
+            capture_time = file_info.capture_time
+            if capture_time is None:
+                continue
+            
+            file_info.capture_in_window = start <= capture_time.date() <= end
+            if not file_info.capture_in_window:
+                outside.append(file_info)
+        
+        return outside
+    
     def validate_data(self, file_info: FileInfo) -> bool:
         """
         Valida os dados extraídos
@@ -146,49 +524,37 @@ class FileNameParser:
         if not file_info.is_valid:
             return False
         
-        # Validações específicas
+        return self._fields_are_valid(file_info)
+    
+    def _fields_are_valid(self, file_info: FileInfo) -> bool:
+        """Verifica os campos obrigatórios com os validadores pré-compilados"""
         if file_info.condominio_type == CondominioType.COM_BLOCOS:
-            if not file_info.bloco or not file_info.apartamento or not file_info.leitura:
-                return False
-            
-            # Valida bloco (deve ser alfanumérico)
-            if not re.match(r'^[A-Za-z0-9]+$', file_info.bloco):
-                return False
-            
-            # Valida apartamento (deve ser número)
-            if not re.match(r'^\d+$', file_info.apartamento):
-                return False
-            
-            # Valida leitura (deve ser número)
-            if not re.match(r'^\d+$', file_info.leitura):
-                return False
+            fields = ('bloco', 'apartamento', 'leitura')
+        else:
+            fields = ('apartamento', 'leitura')
         
-        elif file_info.condominio_type == CondominioType.SEM_BLOCOS:
-            if not file_info.apartamento or not file_info.leitura:
-                return False
-            
-            # Valida apartamento (deve ser número)
-            if not re.match(r'^\d+$', file_info.apartamento):
-                return False
-            
-            # Valida leitura (deve ser número)
-            if not re.match(r'^\d+$', file_info.leitura):
+        for field in fields:
+            value = getattr(file_info, field)
+            if not value or not FIELD_VALIDATORS[field].fullmatch(value):
                 return False
         
         return True
 
 # Função de conveniência para uso direto
-def parse_file_list(filenames: List[str]) -> Tuple[List[FileInfo], Dict]:
+def parse_file_list(filenames: List[str], registry: Optional[PatternRegistry] = None,
+                    cache=None) -> Tuple[List[FileInfo], Dict]:
     """
     Função simples para processar uma lista de nomes de arquivos
     
     Args:
         filenames: Lista de nomes de arquivos
+        registry: Registro de padrões do condomínio (opcional)
+        cache: ParseCache para reaproveitar resultados de execuções anteriores (opcional)
         
     Returns:
         Tupla com (lista de FileInfo, estatísticas)
     """
-    parser = FileNameParser()
+    parser = FileNameParser(registry, cache)
     files_info = parser.parse_multiple_files(filenames)
     stats = parser.get_statistics(files_info)
     
@@ -0,0 +1,71 @@
+"""
+Armazenamento local de fotos para Extract Fotos
+Responsável por guardar as fotos baixadas endereçadas pelo md5 do Google Drive
+"""
+
+import os
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+# Pasta padrão das fotos baixadas (pode ser sobrescrita no .env)
+DEFAULT_STORE_PATH = "fotos"
+
+# Extensões por tipo MIME
+MIME_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/jpg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/bmp': '.bmp',
+    'image/webp': '.webp',
+}
+
+class LocalPhotoStore:
+    """Armazenamento endereçado por conteúdo: cada foto é salva uma única vez pelo seu md5"""
+
+    def __init__(self, root: Optional[str] = None):
+        """
+        Inicializa o armazenamento
+
+        Args:
+            root: Pasta raiz do armazenamento (opcional)
+        """
+        self.root = Path(root or os.getenv('PHOTO_STORE_PATH', DEFAULT_STORE_PATH))
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, md5_checksum: str, mime_type: Optional[str] = None) -> Path:
+        """Caminho final de uma foto (subpasta com os 2 primeiros caracteres do md5)"""
+        extension = MIME_EXTENSIONS.get(mime_type, '')
+        return self.root / md5_checksum[:2] / f"{md5_checksum}{extension}"
+
+    def partial_path_for(self, md5_checksum: str, mime_type: Optional[str] = None) -> Path:
+        """Caminho do download parcial (mantido entre tentativas para retomada)"""
+        final_path = self.path_for(md5_checksum, mime_type)
+        return final_path.with_name(final_path.name + ".part")
+
+    def has(self, md5_checksum: str, mime_type: Optional[str] = None) -> bool:
+        """Verifica se a foto já está no armazenamento"""
+        return self.path_for(md5_checksum, mime_type).exists()
+
+    def commit(self, md5_checksum: str, mime_type: Optional[str] = None) -> Path:
+        """
+        Valida o download parcial e move para o caminho final
+
+        Raises:
+            ValueError: Se o md5 do arquivo baixado não confere
+        """
+        partial_path = self.partial_path_for(md5_checksum, mime_type)
+
+        digest = hashlib.md5()
+        with open(partial_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+
+        if digest.hexdigest() != md5_checksum:
+            partial_path.unlink()
+            raise ValueError(f"md5 não confere para {md5_checksum} (download descartado)")
+
+        final_path = self.path_for(md5_checksum, mime_type)
+        os.replace(partial_path, final_path)
+        return final_path
@@ -0,0 +1,176 @@
+"""
+Progresso e cancelamento para Extract Fotos
+Responsável por medir o andamento de cada etapa, estimar o tempo restante e permitir
+cancelar o processamento em pontos seguros (entre páginas, lotes e blocos de linhas)
+"""
+
+import os
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+# Intervalo mínimo entre duas mensagens de progresso da mesma etapa (segundos)
+REPORT_INTERVAL = 2.0
+
+class OperationCancelled(Exception):
+    """Processamento cancelado pelo usuário ou pelo serviço"""
+
+class CancellationToken:
+    """Sinal de cancelamento cooperativo, verificado pelo pipeline nos pontos seguros"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Solicita o cancelamento"""
+        self._event.set()
+
+    @property
+    def is_cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """
+        Interrompe a etapa atual se o cancelamento foi solicitado
+
+        Raises:
+            OperationCancelled: Se cancel() já foi chamado
+        """
+        if self._event.is_set():
+            raise OperationCancelled("Processamento cancelado")
+
+class ProgressTracker:
+    """Acompanha as etapas do processamento com vazão e tempo restante estimado"""
+
+    def __init__(self, callback: Optional[Callable[[str, int, Optional[int], Optional[float]], None]] = None,
+                 report_interval: float = REPORT_INTERVAL):
+        """
+        Inicializa o acompanhamento
+
+        Args:
+            callback: Função chamada com (etapa, concluídos, total, segundos restantes);
+                      padrão: imprime no terminal
+            report_interval: Intervalo mínimo entre chamadas do callback na mesma etapa
+        """
+        self.callback = callback or print_progress
+        self.report_interval = report_interval
+
+        self.stage: Optional[str] = None
+        self.total: Optional[int] = None
+        self.completed = 0
+        self._started = 0.0
+        self._last_report = 0.0
+
+    def start(self, stage: str, total: Optional[int] = None):
+        """Inicia uma etapa (total None quando ainda não é conhecido, ex.: listagem paginada)"""
+        self.stage = stage
+        self.total = total
+        self.completed = 0
+        self._started = time.monotonic()
+        self._last_report = self._started
+
+    def advance(self, count: int = 1):
+        """Registra itens concluídos na etapa atual"""
+        self.completed += count
+
+        now = time.monotonic()
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            self.callback(self.stage, self.completed, self.total, self.eta())
+
+    def finish(self):
+        """Encerra a etapa atual (sempre informa o resultado final)"""
+        if self.stage is not None:
+            self.callback(self.stage, self.completed, self.total, 0.0 if self.total else None)
+        self.stage = None
+
+    @property
+    def rate(self) -> float:
+        """Vazão da etapa atual (itens por segundo)"""
+        elapsed = time.monotonic() - self._started
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        """Segundos restantes estimados pela vazão (None se o total não é conhecido)"""
+        if not self.total or self.rate <= 0:
+            return None
+        return max(self.total - self.completed, 0) / self.rate
+
+def print_progress(stage: str, completed: int, total: Optional[int], eta: Optional[float]):
+    """Exibe o progresso de uma etapa no terminal"""
+    if total:
+        eta_text = f", faltam ~{eta:.0f}s" if eta else ""
+        print(f"   ⏳ {stage}: {completed}/{total} ({completed / total * 100:.0f}%{eta_text})")
+    else:
+        print(f"   ⏳ {stage}: {completed}")
+
+def track(items, tracker: Optional[ProgressTracker], cancel_token: Optional[CancellationToken],
+          batch_size: int) -> Iterator:
+    """
+    Percorre uma sequência em lotes, verificando o cancelamento e avançando o progresso a cada lote
+
+    Args:
+        items: Sequência (com len) a percorrer
+        tracker: Acompanhamento de progresso (opcional)
+        cancel_token: Sinal de cancelamento (opcional)
+        batch_size: Itens por lote
+
+    Yields:
+        Os itens da sequência
+    """
+    for start in range(0, len(items), batch_size):
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        batch = items[start:start + batch_size]
+        yield from batch
+        if tracker:
+            tracker.advance(len(batch))
+
+def temp_output_name(filename: str) -> str:
+    """Nome temporário (oculto) na mesma pasta de filename, exclusivo do processo e da thread"""
+    folder, name = os.path.split(filename)
+    return os.path.join(folder, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+@contextmanager
+def atomic_output(filename: str) -> Iterator[str]:
+    """
+    Grava um arquivo por meio de um temporário na mesma pasta, renomeado ao final
+
+    Se a gravação falhar ou for cancelada, o arquivo final anterior continua intacto
+    e o temporário é removido.
+
+    Yields:
+        Caminho temporário onde o arquivo deve ser gravado
+    """
+    temp_filename = temp_output_name(filename)
+    try:
+        yield temp_filename
+        os.replace(temp_filename, filename)
+    finally:
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+@contextmanager
+def cancel_on_interrupt(cancel_token: CancellationToken):
+    """
+    Transforma o primeiro Ctrl+C em cancelamento cooperativo (o segundo interrompe na hora)
+
+    Só tem efeito na thread principal; em outras threads o token é usado sem alterar o sinal.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield cancel_token
+        return
+
+    def handler(signum, frame):
+        if cancel_token.is_cancelled:
+            raise KeyboardInterrupt
+        print("\n⏹️  Cancelando no próximo ponto seguro... (Ctrl+C novamente para interromper)")
+        cancel_token.cancel()
+
+    previous = signal.signal(signal.SIGINT, handler)
+    try:
+        yield cancel_token
+    finally:
+        signal.signal(signal.SIGINT, previous)
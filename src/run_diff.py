@@ -0,0 +1,281 @@
+"""
+Comparação entre execuções para Extract Fotos
+Responsável por salvar o retrato de cada listagem e mostrar o que mudou entre duas execuções
+"""
+
+import os
+import csv
+import json
+import argparse
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill
+
+from parser import FileInfo, unit_key, unit_sort_key
+from consolidate import ReportSource
+from progress import atomic_output
+
+# Pasta padrão dos retratos de listagem (pode ser sobrescrita no .env)
+DEFAULT_SNAPSHOTS_PATH = Path(__file__).resolve().parent.parent / "dados" / "snapshots"
+
+class ChangeType(Enum):
+    """Tipos de alteração entre duas execuções"""
+    ADICIONADA = "Unidade adicionada"
+    REMOVIDA = "Unidade removida"
+    RENOMEADA = "Arquivo renomeado"
+    LEITURA_ALTERADA = "Leitura alterada"
+    FOTO_ADICIONAL = "Nova foto de unidade existente"
+
+@dataclass
+class RunRecord:
+    """Arquivo de uma execução (retrato de listagem ou linha de relatório)"""
+    filename: str
+    bloco: Optional[str]
+    apartamento: Optional[str]
+    leitura: Optional[str]
+    file_id: Optional[str] = None
+
+    @property
+    def key(self) -> Optional[Tuple[str, str]]:
+        """Chave da unidade (None para arquivos inválidos)"""
+        if not self.apartamento or not self.leitura:
+            return None
+        return unit_key(self.bloco, self.apartamento)
+
+@dataclass
+class RunChange:
+    """Alteração encontrada para uma unidade"""
+    change_type: ChangeType
+    bloco: Optional[str]
+    apartamento: Optional[str]
+    arquivo_anterior: str = ''
+    arquivo_atual: str = ''
+    leitura_anterior: str = ''
+    leitura_atual: str = ''
+
+def get_snapshots_dir(folder_id: str) -> Path:
+    """Pasta dos retratos de um condomínio"""
+    return Path(os.getenv('SNAPSHOTS_PATH', str(DEFAULT_SNAPSHOTS_PATH))) / folder_id
+
+def save_snapshot(folder_id: str, files_info: List[FileInfo]) -> Path:
+    """
+    Salva o retrato da listagem (ID do Drive, nome e campos extraídos) em JSON
+
+    Args:
+        folder_id: ID da pasta no Google Drive
+        files_info: Lista de FileInfo processados
+
+    Returns:
+        Caminho do retrato salvo
+    """
+    folder = get_snapshots_dir(folder_id)
+    folder.mkdir(parents=True, exist_ok=True)
+
+    path = folder / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    snapshot = {
+        'folder_id': folder_id,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'files': [
+            {
+                'id': f.file_id,
+                'name': f.filename,
+                'bloco': f.bloco,
+                'apartamento': f.apartamento,
+                'leitura': f.leitura,
+            }
+            for f in files_info
+        ],
+    }
+    with atomic_output(str(path)) as temp_filename:
+        with open(temp_filename, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False)
+    return path
+
+def latest_snapshot(folder_id: str) -> Optional[Path]:
+    """Retrato mais recente de um condomínio (None se não houver)"""
+    folder = get_snapshots_dir(folder_id)
+    if not folder.exists():
+        return None
+    snapshots = sorted(folder.glob('*.json'))
+    return snapshots[-1] if snapshots else None
+
+def load_run(path: str) -> List[RunRecord]:
+    """
+    Carrega uma execução de um retrato JSON ou de um relatório (.xlsx, .csv, .parquet)
+
+    Relatórios não têm o ID do Drive, então a comparação usa apenas a unidade.
+    """
+    if str(path).lower().endswith('.json'):
+        with open(path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        return [
+            RunRecord(item['name'], item.get('bloco'), item.get('apartamento'),
+                      item.get('leitura'), item.get('id'))
+            for item in snapshot['files']
+        ]
+
+    text = ReportSource._text
+    return [
+        RunRecord(str(row.get('Nome do Arquivo') or ''), text(row.get('Bloco')),
+                  text(row.get('Apartamento')), text(row.get('Leitura')))
+        for row in ReportSource(str(path)).records()
+    ]
+
+def diff_runs(previous: List[RunRecord], current: List[RunRecord]) -> List[RunChange]:
+    """
+    Compara duas execuções com hash joins (tempo linear no número de arquivos)
+
+    Primeiro cruza pelo ID do Drive: um arquivo que continua na mesma unidade e mudou
+    de nome é um arquivo renomeado (ou com leitura alterada). Arquivos que mudaram de
+    unidade, ou passaram de inválido para válido (e vice-versa), seguem para o cruzamento
+    por (bloco, apartamento), que encontra unidades adicionadas, removidas ou com
+    leitura alterada. Um arquivo novo de uma unidade cujo arquivo anterior continua
+    presente (pareado pelo ID) é uma foto adicional, não uma alteração de leitura.
+
+    Args:
+        previous: Arquivos da execução anterior
+        current: Arquivos da execução atual
+
+    Returns:
+        Lista de RunChange ordenada por bloco/apartamento
+    """
+    changes: List[RunChange] = []
+
+    # 1. Join pelo ID do Drive (só pareia arquivos que continuam na mesma unidade)
+    previous_by_id = {r.file_id: r for r in previous if r.file_id}
+    matched_ids = set()
+    for record in current:
+        old = previous_by_id.get(record.file_id) if record.file_id else None
+        if old is None or old.key is None or old.key != record.key:
+            continue
+        matched_ids.add(record.file_id)
+        if old.filename != record.filename:
+            change_type = ChangeType.RENOMEADA if old.leitura == record.leitura else ChangeType.LEITURA_ALTERADA
+            changes.append(RunChange(
+                change_type, record.bloco, record.apartamento,
+                old.filename, record.filename, old.leitura, record.leitura
+            ))
+
+    # 2. Join por unidade com os arquivos que não foram pareados pelo ID
+    # (a presença da unidade considera todos os arquivos, pareados ou não)
+    current_all = _index_by_unit(current)
+    previous_units = _index_by_unit(r for r in previous if r.file_id not in matched_ids)
+    current_units = _index_by_unit(r for r in current if r.file_id not in matched_ids)
+    # Unidades que ainda têm um arquivo da execução anterior (pareado pelo ID)
+    current_matched = _index_by_unit(r for r in current if r.file_id in matched_ids)
+
+    for key, new in current_units.items():
+        old = previous_units.get(key)
+        if old is None and key in current_matched:
+            # O arquivo anterior continua na pasta: o novo é uma foto a mais (possível duplicado)
+            kept = current_matched[key]
+            changes.append(RunChange(
+                ChangeType.FOTO_ADICIONAL, new.bloco, new.apartamento,
+                kept.filename, new.filename, kept.leitura, new.leitura
+            ))
+        elif old is None:
+            changes.append(RunChange(
+                ChangeType.ADICIONADA, new.bloco, new.apartamento,
+                arquivo_atual=new.filename, leitura_atual=new.leitura
+            ))
+        elif old.leitura != new.leitura:
+            changes.append(RunChange(
+                ChangeType.LEITURA_ALTERADA, new.bloco, new.apartamento,
+                old.filename, new.filename, old.leitura, new.leitura
+            ))
+        elif old.filename != new.filename:
+            changes.append(RunChange(
+                ChangeType.RENOMEADA, new.bloco, new.apartamento,
+                old.filename, new.filename, old.leitura, new.leitura
+            ))
+
+    for key, old in previous_units.items():
+        if key not in current_all:
+            changes.append(RunChange(
+                ChangeType.REMOVIDA, old.bloco, old.apartamento,
+                arquivo_anterior=old.filename, leitura_anterior=old.leitura
+            ))
+
+    changes.sort(key=lambda c: unit_sort_key(c.bloco, c.apartamento))
+    return changes
+
+def _index_by_unit(records) -> Dict[Tuple[str, str], RunRecord]:
+    """Indexa os arquivos válidos por unidade (o primeiro arquivo de cada unidade vence)"""
+    index: Dict[Tuple[str, str], RunRecord] = {}
+    for record in records:
+        key = record.key
+        if key is not None and key not in index:
+            index[key] = record
+    return index
+
+def summarize_changes(changes: List[RunChange]) -> Dict[ChangeType, int]:
+    """Conta as alterações por tipo"""
+    summary = {change_type: 0 for change_type in ChangeType}
+    for change in changes:
+        summary[change.change_type] += 1
+    return summary
+
+def write_diff_report(changes: List[RunChange], output_filename: str) -> str:
+    """
+    Grava as alterações em CSV ou em uma planilha "Alterações" (.xlsx)
+
+    Returns:
+        Caminho do arquivo gerado
+    """
+    header = ["Tipo", "Bloco", "Apartamento", "Arquivo Anterior", "Arquivo Atual",
+              "Leitura Anterior", "Leitura Atual"]
+    rows = (
+        [c.change_type.value, c.bloco or '', c.apartamento or '', c.arquivo_anterior,
+         c.arquivo_atual, c.leitura_anterior, c.leitura_atual]
+        for c in changes
+    )
+
+    if output_filename.lower().endswith('.csv'):
+        with atomic_output(output_filename) as temp_filename:
+            with open(temp_filename, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+        return output_filename
+
+    workbook = Workbook(write_only=True)
+    ws = workbook.create_sheet("Alterações")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(color="FFFFFF", bold=True)
+
+    header_cells = []
+    for title in header:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.fill = header_fill
+        cell.font = header_font
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in rows:
+        ws.append(row)
+
+    with atomic_output(output_filename) as temp_filename:
+        workbook.save(temp_filename)
+    return output_filename
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Mostra o que mudou entre duas execuções")
+    arg_parser.add_argument("anterior", help="Retrato (.json) ou relatório da execução anterior")
+    arg_parser.add_argument("atual", help="Retrato (.json) ou relatório da execução atual")
+    arg_parser.add_argument("saida", help="Arquivo de saída (.xlsx ou .csv)")
+    args = arg_parser.parse_args()
+
+    try:
+        changes = diff_runs(load_run(args.anterior), load_run(args.atual))
+        write_diff_report(changes, args.saida)
+        for change_type, count in summarize_changes(changes).items():
+            print(f"   {change_type.value}: {count}")
+        print(f"✅ Alterações salvas em: {args.saida}")
+    except Exception as e:
+        print(f"❌ Erro durante a comparação: {e}")
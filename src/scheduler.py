@@ -0,0 +1,217 @@
+"""
+Agendador do Extract Fotos
+Responsável por consultar o Drive periodicamente e enfileirar apenas as pastas com fotos novas
+"""
+
+import os
+import time
+import random
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from google_drive import GoogleDriveClient
+from condominio_config import load_config_file
+from job_queue import JobQueue
+
+# Caminho padrão do estado do agendador (pode ser sobrescrito no .env)
+DEFAULT_STATE_PATH = Path(__file__).resolve().parent.parent / "dados" / "agendador.sqlite3"
+
+# Intervalo padrão entre consultas (segundos) e variação aleatória somada a ele
+DEFAULT_INTERVAL = 3600
+DEFAULT_JITTER = 300
+
+# Consultas simultâneas no modo por pasta
+DEFAULT_MAX_CHECKS = 4
+
+class DetectionMode:
+    """Formas de detectar alterações"""
+    # Changes API: uma consulta para todas as pastas; percebe fotos novas, alteradas e
+    # movidas para a lixeira, mas não exclusões definitivas (a alteração não traz a pasta)
+    CHANGES = "changes"
+    CONSULTA = "consulta"    # modifiedTime das imagens: uma consulta por pasta
+
+class SchedulerState:
+    """Token da Changes API, pastas já vistas e última verificação de cada pasta, em SQLite"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Abre (ou cria) o estado do agendador
+
+        Args:
+            db_path: Caminho do arquivo SQLite (opcional)
+        """
+        self.db_path = Path(db_path or os.getenv('SCHEDULER_STATE_PATH', str(DEFAULT_STATE_PATH)))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS estado (
+                chave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT valor FROM estado WHERE chave = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_many(self, values: Dict[str, str]):
+        """Grava vários valores em uma única transação"""
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO estado (chave, valor) VALUES (?, ?)", list(values.items())
+        )
+        self._conn.commit()
+
+    def close(self):
+        """Fecha a conexão com o banco"""
+        self._conn.close()
+
+class ChangeScheduler:
+    """Enfileira o processamento apenas das pastas cadastradas que receberam alterações"""
+
+    def __init__(self, folder_ids: List[str], drive_client: GoogleDriveClient,
+                 queue: Optional[JobQueue] = None, state: Optional[SchedulerState] = None,
+                 mode: str = DetectionMode.CHANGES, max_checks: int = DEFAULT_MAX_CHECKS,
+                 max_enqueue: Optional[int] = None):
+        """
+        Inicializa o agendador
+
+        Args:
+            folder_ids: Pastas monitoradas
+            drive_client: Cliente do Google Drive
+            queue: Fila de pedidos (opcional, usa o arquivo padrão)
+            state: Estado persistido (opcional, usa o arquivo padrão)
+            mode: DetectionMode.CHANGES ou DetectionMode.CONSULTA
+            max_checks: Consultas simultâneas ao Drive no modo por pasta
+            max_enqueue: Máximo de pastas enfileiradas por ciclo (as demais ficam para o próximo)
+        """
+        self.folder_ids = list(dict.fromkeys(folder_ids))
+        self.drive_client = drive_client
+        self.queue = queue or JobQueue()
+        self.state = state or SchedulerState()
+        self.mode = mode
+        self.max_checks = max_checks
+        self.max_enqueue = max_enqueue
+
+    def run_once(self) -> List[str]:
+        """
+        Executa um ciclo: detecta as pastas alteradas e enfileira o processamento
+
+        Pastas sem estado salvo (primeira execução ou pasta cadastrada depois) são
+        sempre enfileiradas.
+
+        Returns:
+            Pastas enfileiradas neste ciclo
+        """
+        if self.mode == DetectionMode.CHANGES:
+            changed = self._detect_with_changes_api()
+        else:
+            changed = self._detect_with_modified_time()
+
+        # Pastas adiadas em ciclos anteriores têm prioridade
+        deferred = [f for f in self.folder_ids if self.state.get(f"adiada:{f}") == '1']
+        ordered = deferred + [f for f in self.folder_ids if f in changed and f not in deferred]
+
+        limit = self.max_enqueue if self.max_enqueue is not None else len(ordered)
+        enqueued = ordered[:limit]
+        for folder_id in enqueued:
+            self.queue.enqueue(folder_id)
+
+        self.state.set_many({
+            **{f"adiada:{f}": '0' for f in enqueued},
+            **{f"adiada:{f}": '1' for f in ordered[limit:]},
+        })
+        return enqueued
+
+    def run_forever(self, interval: float = DEFAULT_INTERVAL, jitter: float = DEFAULT_JITTER):
+        """Executa ciclos com intervalo + variação aleatória (Ctrl+C encerra)"""
+        try:
+            while True:
+                started = time.time()
+                enqueued = self.run_once()
+                print(f"🕒 {datetime.now():%Y-%m-%d %H:%M:%S} | {len(enqueued)} de {len(self.folder_ids)} "
+                      f"pastas enfileiradas ({time.time() - started:.1f}s)")
+                time.sleep(interval + random.uniform(0, jitter))
+        except KeyboardInterrupt:
+            print("\n👋 Agendador encerrado.")
+
+    def _detect_with_changes_api(self) -> Set[str]:
+        """Lê as alterações desde o último token e mapeia para as pastas monitoradas"""
+        # Pastas ainda não vistas (primeira execução ou cadastradas depois) são processadas
+        # por inteiro: alterações anteriores ao token não aparecem na Changes API
+        seen_markers = {f"vista:{f}": '1' for f in self.folder_ids}
+        unseen = {f for f in self.folder_ids if self.state.get(f"vista:{f}") is None}
+
+        token = self.state.get('page_token')
+        if token is None:
+            # Primeira execução: guarda o token e processa todas as pastas
+            self.state.set_many({'page_token': self.drive_client.get_start_page_token(), **seen_markers})
+            return set(self.folder_ids)
+
+        changes, new_token = self.drive_client.list_changes(token)
+
+        monitored = set(self.folder_ids)
+        changed = set(unseen)
+        for change in changes:
+            file = change.get('file') or {}
+            # Ignora outros tipos de arquivo (ex.: o próprio relatório enviado para a pasta)
+            if not file.get('mimeType', '').startswith('image/'):
+                continue
+            changed.update(monitored.intersection(file.get('parents', [])))
+
+        # Token só avança depois de ler todas as páginas
+        self.state.set_many({'page_token': new_token, **seen_markers})
+        return changed
+
+    def _detect_with_modified_time(self) -> Set[str]:
+        """Consulta cada pasta por imagens modificadas desde a última verificação"""
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        last_checks = {f: self.state.get(f"verificada:{f}") for f in self.folder_ids}
+
+        def check(folder_id: str) -> bool:
+            # Espalha as consultas para não disparar todas no mesmo instante
+            time.sleep(random.uniform(0, 1))
+            since = last_checks[folder_id]
+            return since is None or self.drive_client.has_changes_since(folder_id, since)
+
+        with ThreadPoolExecutor(max_workers=self.max_checks) as executor:
+            results = dict(zip(self.folder_ids, executor.map(check, self.folder_ids)))
+
+        self.state.set_many({f"verificada:{f}": now for f in self.folder_ids})
+        return {folder_id for folder_id, changed in results.items() if changed}
+
+def get_registered_folders() -> List[str]:
+    """Pastas monitoradas: condomínios do arquivo de configuração e PASTAS_MONITORADAS do .env"""
+    folders = list(load_config_file().get('condominios', {}).keys())
+    folders.extend(f.strip() for f in os.getenv('PASTAS_MONITORADAS', '').split(',') if f.strip())
+    return folders
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    arg_parser = argparse.ArgumentParser(description="Enfileira apenas as pastas com fotos novas")
+    arg_parser.add_argument("--modo", choices=[DetectionMode.CHANGES, DetectionMode.CONSULTA],
+                            default=os.getenv('MODO_AGENDADOR', DetectionMode.CHANGES))
+    arg_parser.add_argument("--intervalo", type=float, default=DEFAULT_INTERVAL, help="Segundos entre ciclos")
+    arg_parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER, help="Variação aleatória (segundos)")
+    arg_parser.add_argument("--max-pastas", type=int, default=None, help="Máximo de pastas enfileiradas por ciclo")
+    arg_parser.add_argument("--uma-vez", action="store_true", help="Executa um único ciclo (ex.: no cron)")
+    args = arg_parser.parse_args()
+
+    folder_ids = get_registered_folders()
+    if not folder_ids:
+        print("❌ Nenhuma pasta cadastrada (config/condominios.json ou PASTAS_MONITORADAS)")
+    else:
+        scheduler = ChangeScheduler(folder_ids, GoogleDriveClient(), mode=args.modo, max_enqueue=args.max_pastas)
+        if args.uma_vez:
+            enqueued = scheduler.run_once()
+            print(f"✅ {len(enqueued)} de {len(folder_ids)} pastas enfileiradas")
+        else:
+            scheduler.run_forever(args.intervalo, args.jitter)
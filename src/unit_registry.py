@@ -0,0 +1,124 @@
+"""
+Cadastro de unidades para Extract Fotos
+Responsável por conferir quais unidades esperadas têm foto e quais fotos não têm unidade
+"""
+
+import csv
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from parser import FileInfo, unit_key
+
+class UnitRegistry:
+    """Cadastro de unidades esperadas de um condomínio, indexado em conjuntos hash"""
+
+    def __init__(self, units: Iterable[Tuple[Optional[str], str]]):
+        """
+        Inicializa o cadastro
+
+        Args:
+            units: Pares (bloco, apartamento); bloco None para condomínios sem blocos
+        """
+        # Chave normalizada -> grafia original (usada nos relatórios)
+        self.units: Dict[Tuple[str, str], Tuple[Optional[str], str]] = {}
+        for bloco, apartamento in units:
+            self.units[unit_key(bloco, apartamento)] = (bloco, apartamento)
+
+    @classmethod
+    def from_config(cls, config: Dict) -> Optional['UnitRegistry']:
+        """
+        Cria o cadastro a partir da configuração do condomínio
+
+        Formatos aceitos (podem ser combinados):
+            "unidades": ["A-101", "A-102", "305"]
+            "unidades_arquivo": "config/unidades.csv"   (colunas bloco, apartamento)
+            "unidades_faixa": {"blocos": ["A", "B"], "andares": [1, 10], "finais": [1, 4]}
+
+        Returns:
+            UnitRegistry ou None se o condomínio não tiver unidades cadastradas
+        """
+        units: List[Tuple[Optional[str], str]] = []
+
+        for label in config.get('unidades', []):
+            units.append(parse_unit_label(str(label)))
+
+        if config.get('unidades_arquivo'):
+            units.extend(load_units_csv(config['unidades_arquivo']))
+
+        if config.get('unidades_faixa'):
+            units.extend(expand_unit_range(config['unidades_faixa']))
+
+        return cls(units) if units else None
+
+    def __len__(self) -> int:
+        return len(self.units)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self.units
+
+    def diff(self, files_info: List[FileInfo]) -> Tuple[List[Tuple[Optional[str], str]], List[FileInfo]]:
+        """
+        Compara as fotos válidas com o cadastro em tempo linear
+
+        Args:
+            files_info: Lista de FileInfo processados
+
+        Returns:
+            Tupla (unidades sem foto, arquivos de unidades fora do cadastro)
+        """
+        found = set()
+        unexpected = []
+
+        for file_info in files_info:
+            if not file_info.is_valid:
+                continue
+            key = unit_key(file_info.bloco, file_info.apartamento)
+            found.add(key)
+            if key not in self.units:
+                unexpected.append(file_info)
+
+        missing = [unit for key, unit in self.units.items() if key not in found]
+        return missing, unexpected
+
+def parse_unit_label(label: str) -> Tuple[Optional[str], str]:
+    """Converte "A-101" em ("A", "101") e "101" em (None, "101")"""
+    label = label.strip()
+    if '-' in label:
+        bloco, apartamento = label.rsplit('-', 1)
+        return bloco.strip(), apartamento.strip()
+    return None, label
+
+def load_units_csv(path: str) -> List[Tuple[Optional[str], str]]:
+    """
+    Carrega unidades de um CSV com colunas bloco e apartamento
+
+    Returns:
+        Lista de pares (bloco, apartamento)
+    """
+    units = []
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for row in csv.DictReader(f):
+            apartamento = (row.get('apartamento') or '').strip()
+            if apartamento:
+                units.append(((row.get('bloco') or '').strip() or None, apartamento))
+    return units
+
+def expand_unit_range(spec: Dict) -> List[Tuple[Optional[str], str]]:
+    """
+    Gera unidades no padrão andar + final (ex.: andar 3, final 2 -> "302")
+
+    Args:
+        spec: {"blocos": [...] (opcional), "andares": [primeiro, último], "finais": [primeiro, último]}
+
+    Returns:
+        Lista de pares (bloco, apartamento)
+    """
+    first_floor, last_floor = spec['andares']
+    first_unit, last_unit = spec['finais']
+    blocos = spec.get('blocos') or [None]
+
+    return [
+        (bloco, f"{floor}{unit:02d}")
+        for bloco in blocos
+        for floor in range(first_floor, last_floor + 1)
+        for unit in range(first_unit, last_unit + 1)
+    ]
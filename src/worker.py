@@ -0,0 +1,159 @@
+"""
+Serviço de fila do Extract Fotos
+Processo contínuo que mantém a conexão com o Drive aberta e executa os pedidos da fila
+"""
+
+import os
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from google_drive import GoogleDriveClient
+from parser import PatternRegistry
+from condominio_config import load_condominio_config
+from job_queue import Job, JobQueue
+from progress import CancellationToken
+from main import get_processing_options, process_files
+
+# Número padrão de pastas processadas ao mesmo tempo
+DEFAULT_MAX_WORKERS = 2
+
+# Intervalo entre consultas à fila quando não há pedidos (segundos)
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Pasta padrão dos relatórios gerados pelo serviço (uma subpasta por condomínio)
+DEFAULT_REPORTS_PATH = "relatorios"
+
+class WorkerService:
+    """Executa os pedidos da fila com um cliente do Drive já autenticado e um pool limitado"""
+
+    def __init__(self, queue: Optional[JobQueue] = None, max_workers: int = DEFAULT_MAX_WORKERS,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, drive_client: Optional[GoogleDriveClient] = None,
+                 options: Optional[Dict] = None):
+        """
+        Inicializa o serviço
+
+        Args:
+            queue: Fila de pedidos (opcional, usa o arquivo padrão)
+            max_workers: Número máximo de pastas processadas ao mesmo tempo
+            poll_interval: Intervalo entre consultas à fila (segundos)
+            drive_client: Cliente já autenticado (opcional, criado na inicialização)
+            options: Opções padrão de process_files (opcional, lidas do .env)
+        """
+        self.queue = queue or JobQueue()
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.options = options if options is not None else get_processing_options()
+        self.drive_client = drive_client
+
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._stop = threading.Event()
+        self._running: Dict[int, CancellationToken] = {}
+
+    def warm_up(self):
+        """Autentica no Drive e compila os padrões uma única vez, antes do primeiro pedido"""
+        if self.drive_client is None:
+            print("🔐 Conectando ao Google Drive...")
+            self.drive_client = GoogleDriveClient()
+        PatternRegistry.from_config(load_condominio_config()).get_matcher()
+
+    def run(self):
+        """Laço principal: retira pedidos enquanto houver vaga no pool (Ctrl+C encerra)"""
+        self.warm_up()
+
+        requeued = self.queue.requeue_interrupted()
+        if requeued:
+            print(f"🔄 {requeued} pedidos interrompidos devolvidos à fila")
+
+        print(f"🟢 Serviço iniciado ({self.max_workers} workers, fila: {self.queue.db_path})")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while not self._stop.is_set():
+                    if not self._slots.acquire(timeout=self.poll_interval):
+                        continue
+
+                    job = self.queue.claim_next()
+                    if job is None:
+                        self._slots.release()
+                        self._stop.wait(self.poll_interval)
+                        continue
+
+                    executor.submit(self._run_job, job)
+            except KeyboardInterrupt:
+                print("\n⏹️  Encerrando: cancelando os pedidos em execução no próximo ponto seguro...")
+                for cancel_token in list(self._running.values()):
+                    cancel_token.cancel()
+            finally:
+                self._stop.set()
+
+        print("👋 Serviço encerrado.")
+
+    def stop(self):
+        """Pede o encerramento do laço principal (os pedidos em execução terminam normalmente)"""
+        self._stop.set()
+
+    def _run_job(self, job: Job):
+        """Executa um pedido e registra o resultado na fila"""
+        started = time.time()
+        cancel_token = self._running[job.job_id] = CancellationToken()
+        requeued = False
+        print(f"▶️  Pedido {job.job_id}: pasta {job.folder_id}")
+        try:
+            # Cada pasta grava em sua própria subpasta (execuções simultâneas não se sobrescrevem)
+            output_dir = os.path.join(os.getenv('RELATORIOS_PATH', DEFAULT_REPORTS_PATH), job.folder_id)
+            success = process_files(
+                job.folder_id, drive_client=self.drive_client, output_dir=output_dir,
+                cancel_token=cancel_token, **{**self.options, **job.options}
+            )
+            if cancel_token.is_cancelled:
+                # Cancelado pelo encerramento do serviço: volta para a fila e roda na próxima vez
+                requeued = self.queue.requeue(job.job_id)
+            else:
+                self.queue.finish(job.job_id, success, None if success else "Processamento sem sucesso")
+        except Exception as e:
+            self.queue.finish(job.job_id, False, str(e))
+            success = False
+        finally:
+            del self._running[job.job_id]
+            self._slots.release()
+
+        if requeued:
+            status = "⏸️  cancelado e devolvido à fila"
+        else:
+            status = "✅ concluído" if success else "❌ falhou"
+        print(f"⏹️  Pedido {job.job_id} {status} em {time.time() - started:.1f}s")
+
+if __name__ == "__main__":
+    load_dotenv()
+
+    arg_parser = argparse.ArgumentParser(description="Serviço de fila do Extract Fotos")
+    subcommands = arg_parser.add_subparsers(dest="comando", required=True)
+
+    service_parser = subcommands.add_parser("servico", help="Executa os pedidos da fila continuamente")
+    service_parser.add_argument("--workers", type=int,
+                                default=int(os.getenv('WORKERS_FILA', DEFAULT_MAX_WORKERS)),
+                                help="Pastas processadas ao mesmo tempo")
+
+    enqueue_parser = subcommands.add_parser("enfileirar", help="Adiciona pastas à fila")
+    enqueue_parser.add_argument("folder_ids", nargs='+', help="IDs das pastas no Google Drive")
+
+    subcommands.add_parser("status", help="Mostra os pedidos mais recentes")
+    args = arg_parser.parse_args()
+
+    if args.comando == "servico":
+        WorkerService(max_workers=args.workers).run()
+    elif args.comando == "enfileirar":
+        with JobQueue() as job_queue:
+            for folder_id in args.folder_ids:
+                print(f"📥 Pasta {folder_id}: pedido {job_queue.enqueue(folder_id)}")
+    else:
+        with JobQueue() as job_queue:
+            print(f"📋 Pedidos pendentes: {job_queue.pending_count()}")
+            for job in job_queue.list_jobs():
+                print(f"   #{job['id']} {job['folder_id']} - {job['status']}"
+                      f"{' (' + job['error'] + ')' if job['error'] else ''}")
@@ -0,0 +1,9 @@
+"""
+Configuração dos testes do Extract Fotos
+Os módulos ficam em src/ e importam uns aos outros diretamente
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
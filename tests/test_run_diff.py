@@ -0,0 +1,76 @@
+"""
+Testes da comparação entre execuções (run_diff.diff_runs)
+"""
+
+from run_diff import ChangeType, RunRecord, diff_runs
+
+def record(filename, bloco, apartamento, leitura, file_id):
+    return RunRecord(filename, bloco, apartamento, leitura, file_id)
+
+def summary(changes):
+    """Alterações como tuplas (tipo, unidade, leitura anterior, leitura atual)"""
+    return sorted(
+        ((c.change_type, f"{c.bloco}-{c.apartamento}", c.leitura_anterior, c.leitura_atual)
+         for c in changes),
+        key=lambda item: item[1]
+    )
+
+def test_arquivo_renomeado_na_mesma_unidade():
+    previous = [record('A-1-5.jpg', 'A', '1', '5', 'x')]
+    current = [record('A-1-5.png', 'A', '1', '5', 'x')]
+
+    assert summary(diff_runs(previous, current)) == [(ChangeType.RENOMEADA, 'A-1', '5', '5')]
+
+def test_leitura_corrigida_no_mesmo_arquivo():
+    previous = [record('A-1-5.jpg', 'A', '1', '5', 'x')]
+    current = [record('A-1-6.jpg', 'A', '1', '6', 'x')]
+
+    assert summary(diff_runs(previous, current)) == [(ChangeType.LEITURA_ALTERADA, 'A-1', '5', '6')]
+
+def test_arquivo_renomeado_para_outra_unidade():
+    # A única foto de A-1 passou a ser de A-2, que tinha outra leitura
+    previous = [record('A-1-5.jpg', 'A', '1', '5', 'x'), record('A-2-7.jpg', 'A', '2', '7', 'z')]
+    current = [record('A-2-5.jpg', 'A', '2', '5', 'x')]
+
+    assert summary(diff_runs(previous, current)) == [
+        (ChangeType.REMOVIDA, 'A-1', '5', ''),
+        (ChangeType.LEITURA_ALTERADA, 'A-2', '7', '5'),
+    ]
+
+def test_nome_invalido_corrigido_vira_unidade_adicionada():
+    previous = [record('A1-5.jpg', None, None, None, 'x')]
+    current = [record('A-1-5.jpg', 'A', '1', '5', 'x')]
+
+    assert summary(diff_runs(previous, current)) == [(ChangeType.ADICIONADA, 'A-1', '', '5')]
+
+def test_nome_valido_que_ficou_invalido_remove_a_unidade():
+    previous = [record('A-1-5.jpg', 'A', '1', '5', 'x')]
+    current = [record('A1-5.jpg', None, None, None, 'x')]
+
+    assert summary(diff_runs(previous, current)) == [(ChangeType.REMOVIDA, 'A-1', '5', '')]
+
+def test_nova_foto_de_unidade_que_manteve_a_anterior():
+    previous = [record('A-101-1.jpg', 'A', '101', '1', 'x')]
+    current = [record('A-101-1.jpg', 'A', '101', '1', 'x'), record('A-101-9.jpg', 'A', '101', '9', 'n')]
+
+    assert summary(diff_runs(previous, current)) == [(ChangeType.FOTO_ADICIONAL, 'A-101', '1', '9')]
+
+def test_foto_substituida_por_outro_arquivo():
+    previous = [record('A-1-5.jpg', 'A', '1', '5', 'x')]
+    current = [record('A-1-8.jpg', 'A', '1', '8', 'y')]
+
+    assert summary(diff_runs(previous, current)) == [(ChangeType.LEITURA_ALTERADA, 'A-1', '5', '8')]
+
+def test_relatorios_sem_id_comparados_por_unidade():
+    previous = [record('A-1-5.jpg', 'A', '1', '5', None), record('A-2-7.jpg', 'A', '2', '7', None)]
+    current = [record('A-1-5.jpg', 'A', '1', '5', None), record('A-3-2.jpg', 'A', '3', '2', None)]
+
+    assert summary(diff_runs(previous, current)) == [
+        (ChangeType.REMOVIDA, 'A-2', '7', ''),
+        (ChangeType.ADICIONADA, 'A-3', '', '2'),
+    ]
+
+def test_execucoes_iguais_nao_tem_alteracoes():
+    files = [record('A-1-5.jpg', 'A', '1', '5', 'x'), record('2-3.jpg', None, '2', '3', 'y')]
+
+    assert diff_runs(files, list(files)) == []